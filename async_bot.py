@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from telebot import TeleBot
+
+import exceptions
+from circuit_breaker import CircuitBreaker
+from dedup import DedupIndex
+from homework import (
+    HEADERS, TELEGRAM_TOKEN, request_homework_statuses,
+    send_chat_message,
+)
+from http_session import get_session
+from logging_setup import setup_logging
+from rate_limit import create_limiter
+from response_cache import ResponseCache
+from scheduling import create_scheduler, due_tenants, next_wakeup, stagger
+from shutdown import SHUTDOWN_TIMEOUT
+from snapshot import create_snapshot
+from tenants import Poller, TenantRegistry
+
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 50))
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 5))
+
+
+async def get_api_answer_async(timestamp, headers=HEADERS, session=None):
+    """Запрос к эндпоинту API в потоке пула, не блокирующий цикл."""
+    return await asyncio.to_thread(
+        request_homework_statuses, headers, timestamp, session
+    )
+
+
+async def send_message_async(bot, chat_id, message):
+    """Отправляет сообщение в Telegram-чат в потоке пула."""
+    await asyncio.to_thread(send_chat_message, bot, chat_id, message)
+
+
+class AsyncPipeline:
+    """Конкурентный опрос подписчиков и доставка уведомлений."""
+
+    def __init__(
+        self, bot, tenants, poll_concurrency=POLL_CONCURRENCY,
+        send_concurrency=SEND_CONCURRENCY, poller=None, dedup=None,
+    ):
+        self.bot = bot
+        self.tenants = tenants
+        self.poller = poller or Poller()
+        self.poll_concurrency = poll_concurrency
+        self.poll_limit = asyncio.Semaphore(poll_concurrency)
+        self.send_concurrency = send_concurrency
+        self.outbox = asyncio.Queue()
+        self.dedup = dedup
+        self.stopping = asyncio.Event()
+
+    def stop(self):
+        """Просит завершить работу после начатых опросов."""
+        logging.info('Получен сигнал остановки')
+        self.stopping.set()
+
+    async def poll(self, tenant):
+        """Опрашивает API для подписчика и ставит сообщение в очередь."""
+        async with self.poll_limit:
+            if self.stopping.is_set():
+                return
+            messages = await asyncio.to_thread(self.poller.check, tenant)
+        for message in messages:
+            if self.dedup is None or self.dedup.claim(tenant.chat_id, message):
+                await self.outbox.put((tenant.chat_id, message))
+
+    async def deliver(self):
+        """Забирает сообщения из очереди и отправляет их в Telegram."""
+        while True:
+            chat_id, message = await self.outbox.get()
+            try:
+                await send_message_async(self.bot, chat_id, message)
+            except Exception as error:
+                logging.exception(
+                    f'Сбой отправки сообщения в чат {chat_id}: {error}'
+                )
+            finally:
+                self.outbox.task_done()
+
+    async def run_cycle(self):
+        """Опрашивает подписчиков, которым пора.
+
+        Доставку ведут отдельные задачи, поэтому медленный Telegram
+        не задерживает следующий цикл опроса.
+        """
+        due = due_tenants(self.tenants, time.monotonic())
+        await asyncio.gather(*(self.poll(tenant) for tenant in due))
+        return due
+
+    async def sleep(self, delay):
+        """Ждёт следующего цикла; stop() прерывает ожидание."""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, cycles=None, on_cycle=None):
+        """Выполняет циклы опроса; при cycles=None работает до stop().
+
+        Очередь отправки дожидается только при завершении.
+        """
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+            max_workers=self.poll_concurrency + self.send_concurrency
+        ))
+        workers = [
+            asyncio.create_task(self.deliver())
+            for _ in range(self.send_concurrency)
+        ]
+        try:
+            cycle = 0
+            while not self.stopping.is_set() and (
+                cycles is None or cycle < cycles
+            ):
+                due = await self.run_cycle()
+                if on_cycle is not None:
+                    on_cycle(due)
+                cycle += 1
+                if cycles is None or cycle < cycles:
+                    await self.sleep(
+                        next_wakeup(self.tenants, time.monotonic())
+                    )
+        finally:
+            try:
+                await asyncio.wait_for(self.outbox.join(), SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logging.warning(
+                    f'За {SHUTDOWN_TIMEOUT} с не доставлено сообщений: '
+                    f'{self.outbox.qsize()}'
+                )
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def serve(pipeline, registry):
+    """Работает до SIGTERM или SIGINT и сохраняет состояние подписчиков.
+
+    Сигнал не отменяет начатые опросы: их сообщения попадают в очередь
+    и доставляются до выхода.
+    """
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, pipeline.stop)
+    try:
+        await pipeline.run(on_cycle=registry.save)
+        logging.info('Бот остановлен.')
+    finally:
+        registry.save(pipeline.tenants)
+
+
+def main():
+    """Асинхронный режим опроса всех подписчиков реестра."""
+    if TELEGRAM_TOKEN is None:
+        logging.critical('Отсутсвует переменная окружения TELEGRAM_TOKEN')
+        raise exceptions.TokensError('Ошибка небходимых переменных.')
+
+    bot = TeleBot(token=TELEGRAM_TOKEN)
+    registry = TenantRegistry(snapshot=create_snapshot())
+    poller = Poller(
+        session=get_session(), cache=ResponseCache(),
+        scheduler=create_scheduler(), breaker=CircuitBreaker('practicum'),
+        limiter=create_limiter(),
+    )
+    tenants = registry.load()
+    stagger(tenants, time.monotonic(), poller.scheduler.period)
+    pipeline = AsyncPipeline(bot, tenants, poller=poller, dedup=DedupIndex())
+    try:
+        asyncio.run(serve(pipeline, registry))
+    finally:
+        registry.close()
+
+
+if __name__ == '__main__':
+    setup_logging(f'{Path(__file__).stem}.log', level=logging.INFO)
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import bisect
+import gc
+import logging
+import time
+import tracemalloc
+
+from telebot import TeleBot, apihelper
+
+import homework
+from benchmarks.fake_servers import FakePracticum, FakeTelegram
+from delivery import DeliveryQueue
+from fanout import FanOut
+from http_session import create_session
+from response_cache import ResponseCache
+from schema import Homework
+from scheduling import FixedScheduler, due_tenants, next_wakeup
+from tenants import Poller, Tenant, poll_tenants
+
+
+def percentile(values, share):
+    """Перцентиль отсортированного списка."""
+    if not values:
+        return float('nan')
+    index = min(len(values) - 1, int(share * len(values)))
+    return values[index]
+
+
+def notification_latencies(practicum, telegram):
+    """Задержки от смены статуса до получения сообщения в Telegram."""
+    latencies = []
+    for received_at, chat_id, text in telegram.received:
+        if text == homework.NO_CHANGES_MESSAGE:
+            continue
+        changes = practicum.changes.get(f'token-{chat_id}', [])
+        index = bisect.bisect_right(changes, received_at)
+        if index:
+            latencies.append(received_at - changes[index - 1])
+    return sorted(latencies)
+
+
+def tenant_memory(count):
+    """Память на одного подписчика после первого опроса, в байтах."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tenants = [Tenant(f'token-{index}', str(index)) for index in range(count)]
+    for tenant in tenants:
+        tenant.tracker.transitions([Homework(1, 'hw.zip', 'reviewing')])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'lineno'))
+    return size / count
+
+
+def run(args):
+    """Прогоняет цикл опроса против локальных серверов."""
+    practicum = FakePracticum(
+        latency=args.latency, error_rate=args.error_rate,
+        change_rate=args.change_rate, history=args.history,
+        padding=args.payload, seed=1,
+    ).start()
+    telegram = FakeTelegram(latency=args.telegram_latency, seed=2).start()
+    homework.ENDPOINT = practicum.url + '/api/user_api/homework_statuses/'
+    apihelper.API_URL = telegram.api_url
+
+    tenants = [
+        Tenant(f'token-{index}', str(index)) for index in range(args.tenants)
+    ]
+    poller = Poller(
+        session=create_session(pool_maxsize=args.pool),
+        cache=ResponseCache() if args.cache else None,
+        scheduler=FixedScheduler(args.period),
+    )
+    outbox = DeliveryQueue(
+        TeleBot(token='123:bench'), global_rate=args.send_rate,
+        chat_interval=0,
+    ).start()
+    fanout = FanOut(poller, workers=args.workers) if args.workers else None
+    polls = 0
+    wall = busy = 0.0
+    started = time.monotonic()
+    deadline = started + args.duration
+    try:
+        while time.monotonic() < deadline:
+            due = due_tenants(tenants, time.monotonic())
+            poll_tenants(outbox, due, poller, fanout)
+            if fanout is not None and fanout.report is not None:
+                wall += fanout.report.wall
+                busy += fanout.report.busy
+            polls += len(due)
+            time.sleep(min(
+                next_wakeup(tenants, time.monotonic()),
+                max(0, deadline - time.monotonic()),
+            ))
+        outbox.stop(timeout=5)
+    finally:
+        if fanout is not None:
+            fanout.close()
+        elapsed = time.monotonic() - started
+        practicum.stop()
+        telegram.stop()
+
+    latencies = notification_latencies(practicum, telegram)
+    print(f'подписчиков: {args.tenants}, длительность: {elapsed:.1f} с')
+    print(f'опросов/с: {polls / elapsed:.1f}')
+    print(f'запросов к API: {practicum.requests}')
+    print(f'сообщений в Telegram: {len(telegram.received)}')
+    for share in (0.5, 0.9, 0.99):
+        print(
+            f'задержка уведомления p{int(share * 100)}: '
+            f'{percentile(latencies, share) * 1000:.1f} мс'
+        )
+    if fanout is not None and wall:
+        print(
+            f'пул опроса: {args.workers} потоков, длительность циклов '
+            f'{wall:.2f} с, сумма запросов {busy:.2f} с, '
+            f'параллельность {busy / wall:.1f}'
+        )
+    if poller.cache is not None:
+        print(f'кэш ответов: {poller.cache.stats()}')
+    print(f'память на подписчика: {tenant_memory(args.tenants):.0f} байт')
+
+
+def parse_args(argv=None):
+    """Параметры нагрузки из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный прогон цикла опроса бота.'
+    )
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--period', type=float, default=1)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--telegram-latency', type=float, default=0.002)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--change-rate', type=float, default=0.05)
+    parser.add_argument('--history', type=int, default=0)
+    parser.add_argument('--payload', type=int, default=0)
+    parser.add_argument('--pool', type=int, default=32)
+    parser.add_argument('--send-rate', type=float, default=1000)
+    parser.add_argument('--cache', action='store_true')
+    parser.add_argument('--workers', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    run(parse_args())
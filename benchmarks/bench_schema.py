@@ -0,0 +1,66 @@
+import argparse
+import random
+import timeit
+
+from homework import HOMEWORK_VERDICTS, check_response, parse_status
+from schema import validate_response
+from templates import get_renderer
+
+
+def make_response(size):
+    """Ответ API с size работами."""
+    return {
+        'homeworks': [
+            {
+                'id': index,
+                'homework_name': f'hw{index}.zip',
+                'status': random.choice(list(HOMEWORK_VERDICTS)),
+                'reviewer_comment': 'Комментарий',
+                'date_updated': '2024-01-01T00:00:00Z',
+                'lesson_name': 'Урок',
+            }
+            for index in range(size)
+        ],
+        'current_date': 1700000000,
+    }
+
+
+def with_functions(response):
+    """Текущий путь: check_response() и parse_status() для каждой работы."""
+    return [parse_status(homework) for homework in check_response(response)]
+
+
+def with_schema(response):
+    """Путь бота: validate_response() и Renderer.render()."""
+    render = get_renderer().render
+    return [
+        render(homework) for homework in validate_response(response).homeworks
+    ]
+
+
+def run(args):
+    """Сравнивает время проверки ответа обоими способами."""
+    response = make_response(args.size)
+    assert with_functions(response) == with_schema(response)
+    for name, function in (
+        ('check_response + parse_status', with_functions),
+        ('validate_response', with_schema),
+    ):
+        best = min(timeit.repeat(
+            lambda: function(response), number=args.number, repeat=5
+        ))
+        print(f'{name}: {best / args.number * 1e6:.1f} мкс на ответ')
+
+
+def parse_args(argv=None):
+    """Параметры прогона из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Сравнение проверки ответа API.'
+    )
+    parser.add_argument('--size', type=int, default=20)
+    parser.add_argument('--number', type=int, default=2000)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    run(parse_args())
@@ -0,0 +1,99 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from snapshot import TenantSnapshot
+from tenants import TenantRegistry
+
+
+def fill(registry, count, homeworks):
+    """Заполняет реестр подписчиками с историей работ."""
+    with registry.connection:
+        registry.connection.executemany(
+            'INSERT INTO tenants (token, chat_id) VALUES (?, ?)',
+            [(f'token-{index}', str(index)) for index in range(count)],
+        )
+    tenants = registry.load()
+    for tenant in tenants:
+        tenant.from_date = 1700000000
+        tenant.last_status = 'Работа взята на проверку ревьюером.'
+        for number in range(homeworks):
+            tenant.tracker.statuses[str(number)] = 'approved'
+    return tenants
+
+
+def timed_load(database, path=None, repeat=1):
+    """Лучшая за repeat запусков длительность полной загрузки реестра.
+
+    Каждый запуск открывает реестр заново, поэтому со снимком в замер
+    входят и чтение снимка с журналом, и запрос подписок к SQLite.
+    Возвращает (секунды, из них разбор снимка, число подписчиков).
+    """
+    best = None
+    for _ in range(repeat):
+        snapshot = None if path is None else TenantSnapshot(path)
+        registry = TenantRegistry(database, snapshot)
+        started = time.perf_counter()
+        if snapshot is not None:
+            snapshot.load()
+        decoded = time.perf_counter() - started
+        count = len(registry.load())
+        seconds = time.perf_counter() - started
+        registry.connection.close()
+        if best is None or seconds < best[0]:
+            best = (seconds, decoded, count)
+    return best
+
+
+def run(args):
+    """Сравнивает полную загрузку реестра из SQLite и из снимка."""
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory, 'tenants.sqlite3')
+        path = str(Path(directory, 'tenants.snapshot'))
+
+        registry = TenantRegistry(database)
+        registry.save(fill(registry, args.tenants, args.homeworks))
+        registry.close()
+        seconds, _, count = timed_load(database, repeat=args.repeat)
+        print(f'SQLite и JSON: {count} подписчиков за {seconds * 1000:.0f} мс')
+
+        registry = TenantRegistry(database, TenantSnapshot(path))
+        tenants = registry.load()
+        started = time.perf_counter()
+        registry.save(tenants[:args.changed])
+        print(
+            f'запись в журнал {args.changed} подписчиков: '
+            f'{(time.perf_counter() - started) * 1000:.1f} мс'
+        )
+        registry.close()
+        print(
+            f'снимок: {os.path.getsize(path) / 1024:.0f} КиБ, '
+            f'база SQLite: {os.path.getsize(database) / 1024:.0f} КиБ'
+        )
+
+        seconds, decoded, count = timed_load(
+            database, path, repeat=args.repeat
+        )
+        print(
+            f'снимок через mmap: {count} подписчиков за '
+            f'{seconds * 1000:.0f} мс, из них разбор снимка '
+            f'{decoded * 1000:.0f} мс'
+        )
+
+
+def parse_args(argv=None):
+    """Параметры замера из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Загрузка состояния подписчиков из SQLite и из снимка.'
+    )
+    parser.add_argument('--tenants', type=int, default=20000)
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument('--changed', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    run(parse_args())
@@ -0,0 +1,99 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_servers import FakePracticum, FakeTelegram
+
+ROOT = Path(__file__).resolve().parent.parent
+ONCE_RUN = '''
+import sys
+import telebot.apihelper
+telebot.apihelper.API_URL = sys.argv[2]
+import homework
+homework.ENDPOINT = sys.argv[1]
+homework.run_once()
+'''
+
+
+def timed_run(code, *args, env=None):
+    """Длительность запуска интерпретатора с кодом code, в секундах."""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, '-c', code, *args], cwd=ROOT, env=env, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def slowest_imports(module, count):
+    """Модули с наибольшим суммарным временем импорта по -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def run(args):
+    """Замеряет импорт homework и холодный запуск --once."""
+    baseline = statistics.median(
+        timed_run('pass') for _ in range(args.repeat)
+    )
+    imports = statistics.median(
+        timed_run('import homework') for _ in range(args.repeat)
+    )
+    print(f'пустой интерпретатор: {baseline * 1000:.0f} мс')
+    print(f'import homework: {imports * 1000:.0f} мс')
+    for cumulative, name in slowest_imports('homework', args.top):
+        print(f'  {cumulative / 1000:7.1f} мс  {name}')
+
+    practicum = FakePracticum(latency=args.latency, seed=1).start()
+    telegram = FakeTelegram(latency=args.latency, seed=2).start()
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ, PRACTICUM_TOKEN='token-1', TELEGRAM_TOKEN='1:bench',
+            TELEGRAM_CHAT_ID='1', STATE_PATH=str(Path(directory, 'state')),
+        )
+        try:
+            runs = [
+                timed_run(
+                    ONCE_RUN,
+                    practicum.url + '/api/user_api/homework_statuses/',
+                    telegram.api_url, env=env,
+                )
+                for _ in range(args.repeat)
+            ]
+        finally:
+            practicum.stop()
+            telegram.stop()
+    print(f'первый запуск --once: {runs[0] * 1000:.0f} мс')
+    print(
+        'повторный запуск --once (токен уже проверен): '
+        f'{statistics.median(runs[1:] or runs) * 1000:.0f} мс'
+    )
+    print(f'запросов к API: {practicum.requests}, к Telegram: '
+          f'{telegram.requests}')
+
+
+def parse_args(argv=None):
+    """Параметры замера из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Время импорта и холодного запуска бота.'
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    run(parse_args())
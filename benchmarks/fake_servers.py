@@ -0,0 +1,210 @@
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Обработчик без логирования каждого запроса."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        """Отключает алгоритм Нейгла, иначе keep-alive ждёт отложенный ACK."""
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        """Запросы не логируются."""
+
+    def send_json(self, status, payload, headers=()):
+        """Отправляет JSON-ответ."""
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeServer:
+    """Общая часть: сервер в фоновом потоке и настраиваемые задержки."""
+
+    handler = QuietHandler
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(self.handler):
+            server_state = fake
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        """Базовый адрес сервера."""
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        """Останавливает сервер."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def delay_and_fail(self):
+        """Имитирует задержку сети и случайный сбой; True при сбое."""
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        return failed
+
+
+class PracticumHandler(QuietHandler):
+    """Отвечает как эндпоинт статусов домашних работ."""
+
+    server_state = None
+
+    def do_GET(self):
+        """Ответ на запрос статусов."""
+        fake = self.server_state
+        if fake.delay_and_fail():
+            self.send_json(500, {'code': 'server_error'})
+            return
+        token = self.headers.get('Authorization', '').replace('OAuth ', '')
+        query = parse_qs(urlparse(self.path).query)
+        from_date = int(query.get('from_date', ['0'])[0])
+        self.send_json(200, fake.answer(token, from_date))
+
+
+class FakePracticum(FakeServer):
+    """API Практикума, в котором статусы работ меняются с заданной частотой.
+
+    change_rate — вероятность смены статуса работы токена при каждом
+    запросе; время смены запоминается для расчёта задержки уведомления.
+    """
+
+    handler = PracticumHandler
+
+    def __init__(
+        self, change_rate=0.05, history=0, padding=0, **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.change_rate = change_rate
+        self.history = history
+        self.padding = 'x' * padding
+        self.homeworks = {}
+        self.changes = {}
+
+    def answer(self, token, from_date):
+        """Тело ответа для токена."""
+        now = int(time.time())
+        with self.lock:
+            homework = self.homeworks.get(token)
+            if homework is None or self.random.random() < self.change_rate:
+                status = self.random.choice(STATUSES)
+                homework = {
+                    'id': 1,
+                    'homework_name': f'{token}.zip',
+                    'status': status,
+                    'reviewer_comment': self.padding,
+                    'date_updated': now,
+                    'lesson_name': 'Нагрузочный тест',
+                }
+                if self.homeworks.get(token, {}).get('status') != status:
+                    self.changes.setdefault(token, []).append(
+                        time.monotonic()
+                    )
+                self.homeworks[token] = homework
+        homeworks = []
+        if homework['date_updated'] > from_date:
+            homeworks.append(homework)
+        homeworks.extend(
+            {
+                'id': index + 2,
+                'homework_name': f'old-{index}.zip',
+                'status': 'approved',
+                'reviewer_comment': self.padding,
+                'date_updated': 0,
+                'lesson_name': 'Архив',
+            }
+            for index in range(self.history if from_date <= 0 else 0)
+        )
+        return {'homeworks': homeworks, 'current_date': now}
+
+
+class TelegramHandler(QuietHandler):
+    """Отвечает как методы sendMessage и getMe Telegram Bot API."""
+
+    server_state = None
+
+    def do_POST(self):
+        """Приём сообщения."""
+        if urlparse(self.path).path.endswith('/getMe'):
+            self.send_json(200, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'bench',
+            }})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode()
+        params = parse_qs(urlparse(self.path).query)
+        params.update(parse_qs(body))
+        fake = self.server_state
+        if fake.delay_and_fail():
+            self.send_json(429, {
+                'ok': False,
+                'error_code': 429,
+                'description': 'Too Many Requests',
+                'parameters': {'retry_after': 1},
+            })
+            return
+        chat_id = params.get('chat_id', [''])[0]
+        fake.record(chat_id, params.get('text', [''])[0])
+        self.send_json(200, {'ok': True, 'result': {
+            'message_id': fake.requests,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id or 0), 'type': 'private'},
+            'text': params.get('text', [''])[0],
+        }})
+
+    do_GET = do_POST
+
+
+class FakeTelegram(FakeServer):
+    """Telegram Bot API, запоминающий время получения сообщений."""
+
+    handler = TelegramHandler
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.received = []
+
+    def record(self, chat_id, text):
+        """Запоминает полученное сообщение."""
+        with self.lock:
+            self.received.append((time.monotonic(), chat_id, text))
+
+    @property
+    def api_url(self):
+        """Шаблон адреса для telebot.apihelper.API_URL."""
+        return self.url + '/bot{0}/{1}'
@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import exceptions
+from metrics import CIRCUIT_STATE
+
+FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 60))
+HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', 1))
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_practicum_outage(error):
+    """Сбой говорит о недоступности API, а не о данных подписчика.
+
+    Ответы 4xx, кроме 429, относятся к токену подписчика и автомат
+    не размыкают.
+    """
+    if isinstance(error, exceptions.WrongStatusError):
+        status_code = error.status_code or 500
+        return status_code >= 500 or status_code == 429
+    return isinstance(
+        error, (exceptions.RequestError, exceptions.NotJSONError)
+    )
+
+
+class CircuitBreaker:
+    """Автоматический выключатель для одного внешнего сервиса.
+
+    После failure_threshold сбоев подряд автомат размыкается, и вызовы
+    сразу получают CircuitOpenError. Через reset_timeout секунд
+    пропускаются до probes пробных вызовов: успех замыкает автомат,
+    сбой снова размыкает его.
+    """
+
+    def __init__(
+        self, name, failure_threshold=FAILURE_THRESHOLD,
+        reset_timeout=RESET_TIMEOUT, probes=HALF_OPEN_PROBES,
+        is_failure=is_practicum_outage, clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.is_failure = is_failure
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], upstream=name)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        CIRCUIT_STATE.set(STATE_VALUES[state], upstream=self.name)
+        if state == OPEN:
+            logging.warning(
+                f'{self.name}: автомат разомкнут на {self.reset_timeout} с '
+                f'после {self.failures} сбоев подряд'
+            )
+        else:
+            logging.info(f'{self.name}: автомат в состоянии {state}')
+
+    def acquire(self):
+        """Разрешает вызов или выбрасывает CircuitOpenError."""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise exceptions.CircuitOpenError(
+                        f'{self.name} недоступен, запросы приостановлены.',
+                        remaining,
+                    )
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._in_flight >= self.probes:
+                    self.rejected += 1
+                    raise exceptions.CircuitOpenError(
+                        f'{self.name} недоступен, запросы приостановлены.',
+                        self.reset_timeout,
+                    )
+            self._in_flight += 1
+
+    def release(self, failed):
+        """Учитывает исход разрешённого вызова."""
+        with self._lock:
+            self._in_flight -= 1
+            if not failed:
+                self.failures = 0
+                self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if (
+                self.state == HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                self.opened_at = self.clock()
+                self._set_state(OPEN)
+
+    @contextmanager
+    def guard(self):
+        """Выполняет блок под защитой автомата."""
+        self.acquire()
+        failed = False
+        try:
+            yield
+        except Exception as error:
+            failed = self.is_failure(error)
+            raise
+        finally:
+            self.release(failed)
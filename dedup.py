@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEDUP_TTL = float(os.getenv('DEDUP_TTL', 60 * 60))
+DEDUP_DB = os.getenv('DEDUP_DB')
+PURGE_PERIOD = 60
+
+
+class StatusMessage(str):
+    """Сообщение о смене статуса вместе с событием, которое его вызвало.
+
+    event — (работа, статус, время изменения): по нему повторный переход
+    в тот же статус отличается от повтора того же уведомления.
+    """
+
+    def __new__(cls, message, event):
+        """Текст message с событием event."""
+        self = super().__new__(cls, message)
+        self.event = event
+        return self
+
+
+def event_digest(chat_id, message):
+    """Отпечаток уведомления: чат и событие, а без события — текст."""
+    event = getattr(message, 'event', None)
+    key = message if event is None else '\0'.join(
+        ('event', *map(str, event))
+    )
+    return hashlib.blake2b(
+        f'{chat_id}\0{key}'.encode(), digest_size=16
+    ).digest()
+
+
+class DedupIndex:
+    """Индекс отправленных уведомлений с вытеснением по TTL.
+
+    Одно и то же уведомление в один чат отправляется не чаще раза в ttl
+    секунд: чередующиеся ошибки и повторы после перезапуска или из
+    соседнего воркера отсекаются до обращения к Telegram. Сообщения
+    о смене статуса сравниваются по событию, а не по тексту. Со path
+    индекс хранится в SQLite и общий для процессов на одной базе.
+    """
+
+    def __init__(self, ttl=DEDUP_TTL, path=DEDUP_DB, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.suppressed = 0
+        self.connection = None
+        self.purged_at = 0
+        self._lock = threading.Lock()
+        if path is not None:
+            self.connection = sqlite3.connect(
+                path, check_same_thread=False
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS sent_messages ('
+                'digest BLOB PRIMARY KEY, '
+                'expires REAL NOT NULL)'
+            )
+            self.connection.commit()
+
+    def _evict(self, now):
+        while self.entries:
+            digest, expires = next(iter(self.entries.items()))
+            if expires > now:
+                return
+            del self.entries[digest]
+
+    def _claim_shared(self, digest, now):
+        with self.connection:
+            if now - self.purged_at >= PURGE_PERIOD:
+                self.purged_at = now
+                self.connection.execute(
+                    'DELETE FROM sent_messages WHERE expires <= ?', (now,)
+                )
+            cursor = self.connection.execute(
+                'INSERT INTO sent_messages (digest, expires) VALUES (?, ?) '
+                'ON CONFLICT (digest) DO UPDATE SET expires = '
+                'excluded.expires WHERE sent_messages.expires <= ?',
+                (digest, now + self.ttl, now),
+            )
+        return cursor.rowcount > 0
+
+    def claim(self, chat_id, message):
+        """True, если сообщение нужно отправить; отметка ставится сразу.
+
+        Отметка ставится до отправки, поэтому два воркера не отправят
+        одно сообщение дважды.
+        """
+        digest = event_digest(chat_id, message)
+        now = self.clock()
+        with self._lock:
+            self._evict(now)
+            if digest in self.entries or (
+                self.connection is not None
+                and not self._claim_shared(digest, now)
+            ):
+                self.suppressed += 1
+                return False
+            self.entries[digest] = now + self.ttl
+            return True
+
+    def release(self, chat_id, message):
+        """Снимает отметку, если сообщение так и не удалось отправить."""
+        digest = event_digest(chat_id, message)
+        with self._lock:
+            self.entries.pop(digest, None)
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.execute(
+                        'DELETE FROM sent_messages WHERE digest = ?',
+                        (digest,),
+                    )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        if self.connection is not None:
+            self.connection.close()
@@ -0,0 +1,281 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+import requests
+from telebot.apihelper import (
+    ApiException, ApiHTTPException, ApiInvalidJSONException,
+    ApiTelegramException,
+)
+
+import exceptions
+from logging_setup import fields
+from metrics import timed
+
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 4))
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 25))
+CHAT_INTERVAL = float(os.getenv('TELEGRAM_CHAT_INTERVAL', 1))
+MAX_ATTEMPTS = int(os.getenv('SEND_MAX_ATTEMPTS', 5))
+RETRY_PERIOD = float(os.getenv('SEND_RETRY_PERIOD', 1))
+MAX_MESSAGE_LENGTH = 4096
+SEPARATOR = '\n\n'
+
+
+def get_retry_after(error):
+    """Извлекает retry_after из ответа Telegram об ограничении частоты."""
+    if error.error_code != 429:
+        return None
+    parameters = (error.result_json or {}).get('parameters') or {}
+    return parameters.get('retry_after')
+
+
+def is_outage(error):
+    """Сбой Telegram, а не отказ в отправке конкретному чату.
+
+    Страница ошибки 5xx без JSON приходит как ApiHTTPException.
+    """
+    if isinstance(error, ApiTelegramException):
+        return error.error_code >= 500
+    if isinstance(error, ApiHTTPException):
+        return error.result.status_code >= 500
+    return isinstance(
+        error, (ApiInvalidJSONException, requests.RequestException)
+    )
+
+
+def coalesce(messages, limit=MAX_MESSAGE_LENGTH):
+    """Склеивает сообщения в одно, пока оно не длиннее limit.
+
+    Возвращает текст и сообщения, которые в него не поместились.
+    """
+    size = len(messages[0])
+    count = 1
+    while count < len(messages):
+        size += len(SEPARATOR) + len(messages[count])
+        if size > limit:
+            break
+        count += 1
+    return SEPARATOR.join(messages[:count]), messages[count:]
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений с пулом отправителей.
+
+    Сообщения одному чату, накопившиеся до отправки, объединяются в одно.
+    Отправка соблюдает общий лимит Telegram и лимит на чат, а при ответе
+    429 ждёт retry_after и повторяет отправку, не расходуя попыток
+    max_attempts. Пока автомат breaker
+    разомкнут, сообщения откладываются без расхода попыток. Сообщения,
+    которые индекс dedup уже видел, в очередь не попадают.
+    """
+
+    def __init__(
+        self, bot, workers=SEND_WORKERS, global_rate=GLOBAL_RATE,
+        chat_interval=CHAT_INTERVAL, max_attempts=MAX_ATTEMPTS,
+        retry_period=RETRY_PERIOD, clock=time.monotonic, sleep=time.sleep,
+        breaker=None, dedup=None,
+    ):
+        self.bot = bot
+        self.send = timed('send_message')(bot.send_message)
+        self.workers = workers
+        self.global_interval = 1 / global_rate
+        self.chat_interval = chat_interval
+        self.max_attempts = max_attempts
+        self.retry_period = retry_period
+        self.clock = clock
+        self.sleep = sleep
+        self.guard = nullcontext if breaker is None else breaker.guard
+        self.dedup = dedup
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._pending = {}
+        self._attempts = {}
+        self._ready_at = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._next_global = 0
+        self._stopping = False
+        self._threads = []
+        self._cond = threading.Condition()
+        self._global_lock = threading.Lock()
+
+    def start(self):
+        """Запускает потоки-отправители."""
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f'delivery-{number}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def put(self, chat_id, message):
+        """Ставит сообщение в очередь на отправку."""
+        if self.dedup is not None and not self.dedup.claim(chat_id, message):
+            logging.debug(
+                f'Повтор сообщения в чат {chat_id} пропущен',
+                extra=fields(chat_id),
+            )
+            return
+        with self._cond:
+            if chat_id in self._pending:
+                self._pending[chat_id].append(message)
+                self.coalesced += 1
+                return
+            self._pending[chat_id] = [message]
+            self._schedule(chat_id)
+
+    def depth(self):
+        """Число сообщений, ожидающих отправки."""
+        with self._cond:
+            return sum(len(messages) for messages in self._pending.values())
+
+    def join(self, timeout=None):
+        """Ждёт, пока очередь опустеет; False, если не успела."""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """Дожидается отправки очереди и останавливает потоки."""
+        drained = self.join(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        return drained
+
+    def _schedule(self, chat_id):
+        ready_at = max(self.clock(), self._ready_at.get(chat_id, 0))
+        heapq.heappush(
+            self._heap, (ready_at, next(self._sequence), chat_id)
+        )
+        self._cond.notify()
+
+    def _take(self):
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                ready_at, _, chat_id = self._heap[0]
+                wait = max(ready_at, self._ready_at.get(chat_id, 0))
+                wait -= self.clock()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                messages = self._pending.pop(chat_id)
+                text, rest = coalesce(messages)
+                self._ready_at[chat_id] = self.clock() + self.chat_interval
+                if rest:
+                    self._pending[chat_id] = rest
+                    self._schedule(chat_id)
+                self._in_flight += 1
+                return chat_id, text, messages[:len(messages) - len(rest)]
+
+    def _work(self):
+        while True:
+            item = self._take()
+            if item is None:
+                return
+            try:
+                self._deliver(*item)
+            except Exception as error:
+                logging.exception(f'Сбой отправителя: {error}')
+                with self._cond:
+                    self._drop(item[0], item[2])
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _wait_global(self):
+        with self._global_lock:
+            now = self.clock()
+            start = max(now, self._next_global)
+            self._next_global = start + self.global_interval
+        if start > now:
+            self.sleep(start - now)
+
+    def _deliver(self, chat_id, text, messages):
+        self._wait_global()
+        started = time.perf_counter()
+        try:
+            with self.guard():
+                self.send(chat_id=chat_id, text=text)
+        except exceptions.CircuitOpenError as error:
+            with self._cond:
+                self._requeue(chat_id, messages, error.retry_after)
+        except ApiTelegramException as error:
+            retry_after = get_retry_after(error)
+            if retry_after is None:
+                self._retry(chat_id, messages, error)
+                return
+            logging.warning(
+                f'Telegram ограничил отправку в чат {chat_id}, повтор через '
+                f'{retry_after} с', extra=fields(chat_id, error=error),
+            )
+            with self._cond:
+                self._requeue(chat_id, messages, retry_after)
+        except (ApiException, requests.RequestException) as error:
+            self._retry(chat_id, messages, error)
+        else:
+            with self._cond:
+                self.sent += 1
+                self._attempts.pop(chat_id, None)
+            logging.debug(
+                'Сообщение успешно отправлено!', extra=fields(
+                    chat_id, latency=time.perf_counter() - started
+                ),
+            )
+
+    def _retry(self, chat_id, messages, error):
+        with self._cond:
+            attempt = self._attempts.get(chat_id, 0) + 1
+            if attempt >= self.max_attempts:
+                self._drop(chat_id, messages)
+                logging.error(
+                    f'Ошибка отправки сообщения: {error}',
+                    extra=fields(chat_id, error=error),
+                )
+                return
+            self._attempts[chat_id] = attempt
+            retry_after = self.retry_period * 2 ** (attempt - 1)
+            logging.warning(
+                f'Повтор отправки в чат {chat_id} через {retry_after} с: '
+                f'{error}', extra=fields(chat_id, error=error),
+            )
+            self._requeue(chat_id, messages, retry_after)
+
+    def _drop(self, chat_id, messages):
+        self._attempts.pop(chat_id, None)
+        self.dropped += 1
+        if self.dedup is not None:
+            for message in messages:
+                self.dedup.release(chat_id, message)
+
+    def _requeue(self, chat_id, messages, delay):
+        self._ready_at[chat_id] = self.clock() + delay
+        if chat_id in self._pending:
+            self._pending[chat_id][:0] = messages
+        else:
+            self._pending[chat_id] = list(messages)
+            self._schedule(chat_id)
@@ -13,7 +13,9 @@ class TokensError(Exception):
 class WrongStatusError(Exception):
     """Когда API домашки возвращает код, отличный от 200."""
 
-    pass
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class NotJSONError(Exception):
@@ -32,3 +34,41 @@ class NotIntCurrentDateError(Exception):
     """Ключ current_date не типа int."""
 
     pass
+
+
+class RetryAfterError(WrongStatusError):
+    """API просит повторить запрос не раньше, чем через retry_after секунд."""
+
+    def __init__(self, message, retry_after, status_code=None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Запрос не выполнен: сервис недоступен, автомат разомкнут."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ShutdownRequested(BaseException):
+    """Получен сигнал остановки.
+
+    Наследуется от BaseException, чтобы не перехватываться обработчиками
+    ошибок цикла опроса.
+    """
+
+    pass
+
+
+class DeadlineError(RequestError):
+    """Запрос к API не уложился в отведённое время."""
+
+    pass
+
+
+class SnapshotError(Exception):
+    """Снимок состояния повреждён или записан другой версией формата."""
+
+    pass
@@ -0,0 +1,169 @@
+import concurrent.futures
+import logging
+import os
+import time
+
+import exceptions
+from logging_setup import fields
+from metrics import POLL_CYCLE, POLL_PARALLELISM
+
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 8))
+POLL_DEADLINE = float(os.getenv('POLL_DEADLINE', 30))
+
+
+class PollResult:
+    """Итог запроса к API для одного подписчика."""
+
+    __slots__ = ('tenant', 'homeworks', 'current_date', 'error', 'elapsed')
+
+    def __init__(
+        self, tenant, homeworks=None, current_date=None, error=None,
+        elapsed=0.0,
+    ):
+        self.tenant = tenant
+        self.homeworks = homeworks
+        self.current_date = current_date
+        self.error = error
+        self.elapsed = elapsed
+
+
+class CycleReport:
+    """Сводка цикла: длительность цикла против суммы длительностей запросов.
+
+    Отношение busy / wall показывает, сколько запросов в среднем
+    выполнялось одновременно; если оно близко к workers, пул мал.
+    """
+
+    __slots__ = ('workers', 'polled', 'failed', 'expired', 'wall', 'busy')
+
+    def __init__(self, workers, polled, failed, expired, wall, busy):
+        self.workers = workers
+        self.polled = polled
+        self.failed = failed
+        self.expired = expired
+        self.wall = wall
+        self.busy = busy
+
+    @property
+    def concurrency(self):
+        """Среднее число одновременных запросов за цикл."""
+        return self.busy / self.wall if self.wall else 0.0
+
+    def __repr__(self):
+        return (
+            f'CycleReport(polled={self.polled}, failed={self.failed}, '
+            f'expired={self.expired}, wall={self.wall:.3f}, '
+            f'busy={self.busy:.3f}, concurrency={self.concurrency:.1f}'
+            f'/{self.workers})'
+        )
+
+
+class FanOut:
+    """Параллельный опрос подписчиков синхронными запросами в пуле потоков.
+
+    В потоках пула выполняется только запрос к API; ответы разбирает и
+    состояние подписчиков меняет вызывающий поток. Поэтому запрос, не
+    уложившийся в deadline, можно просто бросить: его поздний ответ
+    ничего не изменит, а подписчик получит DeadlineError.
+    """
+
+    def __init__(
+        self, poller, workers=POLL_WORKERS, deadline=POLL_DEADLINE,
+        clock=time.monotonic,
+    ):
+        self.poller = poller
+        self.workers = workers
+        self.deadline = deadline
+        self.clock = clock
+        self.report = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='poll'
+        )
+
+    def fetch(self, tenant, started):
+        """Запрос к API для подписчика; выполняется в потоке пула.
+
+        Отсчёт deadline начинается после получения токена ограничителя.
+        """
+        self.poller.throttle(tenant)
+        started[tenant] = begin = self.clock()
+        try:
+            with self.poller.guard():
+                homeworks, current_date = self.poller.fetch(tenant)
+        except Exception as error:
+            return PollResult(
+                tenant, error=error, elapsed=self.clock() - begin
+            )
+        return PollResult(
+            tenant, homeworks, current_date, elapsed=self.clock() - begin
+        )
+
+    def expire(self, pending, started, now):
+        """Снимает запросы, выполняющиеся дольше deadline."""
+        expired = []
+        for future, tenant in list(pending.items()):
+            begin = started.get(tenant)
+            if begin is not None and now - begin >= self.deadline:
+                del pending[future]
+                expired.append(PollResult(
+                    tenant, error=exceptions.DeadlineError(
+                        f'Запрос не уложился в {self.deadline} с.'
+                    ), elapsed=now - begin,
+                ))
+        return expired
+
+    def next_timeout(self, pending, started, now):
+        """Время до ближайшего истечения deadline среди запросов."""
+        running = [
+            started[tenant] for tenant in pending.values()
+            if tenant in started
+        ]
+        if not running:
+            return self.deadline
+        return max(min(running) + self.deadline - now, 0)
+
+    def collect(self, tenants):
+        """Выполняет запросы подписчиков и отдаёт результаты по готовности.
+
+        Исключения запросов не выбрасываются, а попадают в PollResult.error.
+        """
+        started = {}
+        pending = {
+            self.executor.submit(self.fetch, tenant, started): tenant
+            for tenant in tenants
+        }
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, self.next_timeout(pending, started, self.clock()),
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                del pending[future]
+                yield future.result()
+            yield from self.expire(pending, started, self.clock())
+
+    def poll(self, tenants):
+        """Опрашивает подписчиков; возвращает результаты и CycleReport."""
+        begin = self.clock()
+        results = list(self.collect(tenants))
+        wall = self.clock() - begin
+        report = CycleReport(
+            self.workers, len(results),
+            sum(result.error is not None for result in results),
+            sum(
+                isinstance(result.error, exceptions.DeadlineError)
+                for result in results
+            ),
+            wall, sum(result.elapsed for result in results),
+        )
+        self.report = report
+        POLL_CYCLE.observe(wall)
+        POLL_PARALLELISM.set(report.concurrency)
+        logging.debug(f'Параллельный опрос: {report}', extra=fields(
+            latency=wall
+        ))
+        return results, report
+
+    def close(self):
+        """Останавливает пул, не дожидаясь брошенных запросов."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
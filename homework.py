@@ -1,17 +1,30 @@
+import hashlib
 import logging
 import os
 import sys
 import time
 from pathlib import Path
 
-import requests
-from telebot import TeleBot
-from telebot.apihelper import ApiTelegramException
-from dotenv import load_dotenv
-
 import exceptions
+from dedup import DedupIndex, StatusMessage
+from logging_setup import fields, setup_logging
+from metrics import METRICS_PORT, start_http_server, timed
+from shutdown import SHUTDOWN
+from state_store import StateStore
+
+
+def load_env():
+    """Подгружает .env, если он есть.
 
-load_dotenv()
+    Без файла dotenv не импортируется: при запуске по расписанию
+    переменные окружения обычно задаёт сама платформа.
+    """
+    if Path('.env').is_file() or Path(__file__).with_name('.env').is_file():
+        from dotenv import load_dotenv
+        load_dotenv()
+
+
+load_env()
 
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
@@ -19,7 +32,13 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
+TOKEN_CHECK_TTL = int(os.getenv('TOKEN_CHECK_TTL', 24 * 60 * 60))
+REQUEST_TIMEOUT = (
+    float(os.getenv('CONNECT_TIMEOUT', 5)),
+    float(os.getenv('READ_TIMEOUT', 30)),
+)
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+RECORD_PATH = os.getenv('RECORD_PATH')
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
 
@@ -29,6 +48,8 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
+NO_CHANGES_MESSAGE = 'Статус домашки не изменился.'
+
 
 def check_tokens():
     """Проверяет доступность необходимых переменных окружения."""
@@ -45,33 +66,112 @@ def check_tokens():
     return keys_checked
 
 
-def send_message(bot, message):
-    """Отправляет сообщение в Telegram-чат."""
+@timed('send_message')
+def send_chat_message(bot, chat_id, message):
+    """Отправляет сообщение в указанный Telegram-чат."""
+    import requests
+    from telebot.apihelper import ApiTelegramException
+
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        bot.send_message(chat_id=chat_id, text=message)
     except (requests.RequestException, ApiTelegramException) as error:
         logging.error(f'Ошибка отправки сообщения: {error}')
     else:
         logging.debug('Сообщение успешно отправлено!')
 
 
-def get_api_answer(timestamp):
-    """Запрос к единственному эндпоинту API."""
+def send_message(bot, message):
+    """Отправляет сообщение в Telegram-чат."""
+    send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def make_headers(token):
+    """Формирует заголовки авторизации для токена Практикума."""
+    return {'Authorization': f'OAuth {token}'}
+
+
+@timed('fetch_homework_statuses')
+def fetch_homework_statuses(headers, timestamp, session=None, stream=False):
+    """Выполняет запрос к API и возвращает необработанный ответ.
+
+    При stream=True тело ответа не загружается заранее. Если задан
+    RECORD_PATH, остальные ответы дописываются в запись для replay.py.
+    """
+    import requests
+
+    get = requests.get if session is None else session.get
+    options = {'stream': True} if stream else {}
     try:
-        parameters = requests.get(
-            url=ENDPOINT, headers=HEADERS, params={'from_date': timestamp}
+        response = get(
+            url=ENDPOINT, headers=headers, params={'from_date': timestamp},
+            timeout=REQUEST_TIMEOUT, **options,
         )
-        if parameters.status_code != 200:
-            raise exceptions.WrongStatusError('Статус отличается от 200.')
+    except requests.RequestException as error:
+        raise exceptions.RequestError(f'Ошибка запроса API: {error}')
+    if RECORD_PATH and not stream:
+        from replay import get_recorder
+
+        get_recorder(RECORD_PATH).write(headers, timestamp, response)
+    return response
+
+
+def parse_retry_after(value):
+    """Переводит заголовок Retry-After в секунды ожидания."""
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def check_status(parameters):
+    """Проверяет код ответа API."""
+    if parameters.status_code in (429, 503):
+        retry_after = parse_retry_after(
+            parameters.headers.get('Retry-After')
+        )
+        if retry_after is not None:
+            raise exceptions.RetryAfterError(
+                f'API просит повторить запрос через {retry_after} с.',
+                retry_after, parameters.status_code,
+            )
+    if parameters.status_code != 200:
+        raise exceptions.WrongStatusError(
+            'Статус отличается от 200.', parameters.status_code
+        )
+
+
+@timed('decode_response')
+def decode_response(parameters):
+    """Проверяет код ответа API и приводит JSON к типам данных Python."""
+    check_status(parameters)
+    try:
         return parameters.json()
-    except requests.JSONDecodeError as error:
+    except ValueError as error:
         raise exceptions.NotJSONError(
             f'Не получен ожидаемый JSON-объект: {error}'
         )
-    except requests.RequestException as error:
-        raise exceptions.RequestError(f'Ошибка запроса API: {error}')
 
 
+@timed('get_api_answer')
+def request_homework_statuses(headers, timestamp, session=None):
+    """Запрос статусов домашних работ с заданными заголовками."""
+    return decode_response(
+        fetch_homework_statuses(headers, timestamp, session)
+    )
+
+
+def get_api_answer(timestamp):
+    """Запрос к единственному эндпоинту API."""
+    return request_homework_statuses(HEADERS, timestamp)
+
+
+@timed('check_response')
 def check_response(response):
     """Проверяет ответ API."""
     if not isinstance(response, dict):
@@ -90,6 +190,7 @@ def check_response(response):
     return response['homeworks']
 
 
+@timed('parse_status')
 def parse_status(homework):
     """Извлекает статус домашней работы."""
     if 'homework_name' not in homework:
@@ -105,51 +206,221 @@ def parse_status(homework):
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+def homework_key(homework):
+    """Ключ домашней работы: id, а при его отсутствии название."""
+    return str(homework.get('id') or homework.get('homework_name'))
+
+
+def describe_homework(homework):
+    """Ключ, статус и сообщение для словаря с домашней работой."""
+    message = parse_status(homework)
+    return homework_key(homework), homework['status'], message
+
+
+def updated_at(homework):
+    """Время изменения работы из словаря API или schema.Homework."""
+    if isinstance(homework, dict):
+        return homework.get('date_updated')
+    return homework.date_updated
+
+
+class HomeworkTracker:
+    """Последние известные статусы всех домашних работ.
+
+    describe возвращает ключ, статус и сообщение для записи о работе;
+    по умолчанию записи — словари из ответа API. Вместо словаря
+    statuses можно передать функцию, возвращающую его: тогда статусы
+    читаются при первом обращении.
+    """
+
+    __slots__ = ('_statuses', 'describe')
+
+    def __init__(self, statuses=None, describe=describe_homework):
+        self._statuses = (
+            statuses if callable(statuses) else dict(statuses or {})
+        )
+        self.describe = describe
+
+    @property
+    def statuses(self):
+        """Последние статусы работ по ключам."""
+        if callable(self._statuses):
+            self._statuses = dict(self._statuses())
+        return self._statuses
+
+    def transitions(self, homeworks, current_date=None):
+        """Сообщения о сменах статусов, по одному на каждый переход.
+
+        Каждое сообщение — StatusMessage с событием перехода; если API
+        не прислал время изменения работы, берётся current_date.
+        Работа с некорректными данными пропускается и не мешает
+        обработке остальных работ ответа.
+        """
+        messages = []
+        statuses = self.statuses
+        for homework in homeworks:
+            try:
+                key, status, message = self.describe(homework)
+            except (KeyError, ValueError) as error:
+                logging.error(
+                    f'Пропущена работа {homework!r}: {error}',
+                    extra=fields(homework=homework, error=error),
+                )
+                continue
+            if statuses.get(key) != status:
+                statuses[key] = status
+                messages.append(StatusMessage(message, (
+                    key, status, updated_at(homework) or current_date
+                )))
+        return messages
+
+
+def send_once(bot, message, dedup=None):
+    """Отправляет сообщение, если индекс dedup не видел его за TTL."""
+    if dedup is None or dedup.claim(TELEGRAM_CHAT_ID, message):
+        send_message(bot, message)
+
+
+def notify(bot, messages, last_status, dedup=None):
+    """Отправляет новые сообщения и возвращает последнее отправленное."""
+    for message in messages:
+        if message != last_status:
+            send_once(bot, message, dedup)
+            logging.getLogger(__name__).info(message)
+            last_status = message
+    return last_status
+
+
+def check_updates(bot, tracker, timestamp, last_status, dedup=None):
+    """Один опрос API и уведомление о сменах статусов.
+
+    Возвращает новый курсор и последнее отправленное сообщение.
+    """
+    try:
+        response = get_api_answer(timestamp)
+        homeworks = check_response(response)
+        new_statuses = tracker.transitions(
+            homeworks, response.get('current_date')
+        ) or [NO_CHANGES_MESSAGE]
+        last_status = notify(bot, new_statuses, last_status, dedup)
+        timestamp = response.get('current_date', timestamp)
+
+    except (
+        exceptions.NoCurrentDateError, exceptions.NotIntCurrentDateError
+    ) as error:
+        logging.error(error)
+    except Exception as error:
+        message = f'Сбой в работе программы: {error}'
+        logging.error(message)
+        if last_status != str(error):
+            send_once(bot, message, dedup)
+            last_status = str(error)
+    return timestamp, last_status
+
+
 def main():
     """Основная логика работы бота."""
     if check_tokens():
         raise exceptions.TokensError('Ошибка небходимых переменных.')
 
+    from telebot import TeleBot
+
     bot = TeleBot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    last_status = ''
+    state = StateStore()
+    timestamp = state.get('current_date', int(time.time()))
+    last_status = state.get('last_status', '')
+    tracker = HomeworkTracker(state.get('homeworks'))
+    dedup = DedupIndex()
 
     while True:
         try:
-            response = get_api_answer(timestamp)
-            homework = check_response(response)
-            if homework:
-                new_status = parse_status(homework[0])
-            else:
-                new_status = 'Статус домашки не изменился.'
-            if new_status != last_status:
-                send_message(bot, new_status)
-                logger.info(new_status)
-                last_status = new_status
-            timestamp = response.get('current_date', timestamp)
-
-        except (
-            exceptions.NoCurrentDateError, exceptions.NotIntCurrentDateError
-        ) as error:
-            logging.error(error)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-            if last_status != str(error):
-                send_message(bot, message)
-                last_status = str(error)
+            timestamp, last_status = check_updates(
+                bot, tracker, timestamp, last_status, dedup
+            )
         finally:
-            time.sleep(RETRY_PERIOD)
+            state.update(
+                current_date=timestamp, last_status=last_status,
+                homeworks=dict(tracker.statuses),
+            )
+            state.flush()
+            with SHUTDOWN.interruptible():
+                time.sleep(RETRY_PERIOD)
 
 
-if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.DEBUG,
-        filename=f'{Path(__file__).stem}.log',
-        format='%(asctime)s [%(levelname)s] %(message)s\n\
-                %(funcName)s %(lineno)d',
+def token_digest(token):
+    """Отпечаток токена для кэша проверки; сам токен не сохраняется."""
+    return hashlib.blake2b(token.encode(), digest_size=8).hexdigest()
+
+
+def validate_telegram_token(bot, state):
+    """Проверяет токен Telegram через getMe не чаще раза в TOKEN_CHECK_TTL.
+
+    Результат успешной проверки хранится в состоянии бота.
+    """
+    from telebot.apihelper import ApiTelegramException
+
+    digest = token_digest(TELEGRAM_TOKEN)
+    checked = state.get('token_check') or {}
+    if (
+        checked.get('digest') == digest
+        and time.time() - checked.get('at', 0) < TOKEN_CHECK_TTL
+    ):
+        return
+    try:
+        bot.get_me()
+    except ApiTelegramException as error:
+        logging.critical(f'Токен Telegram не прошёл проверку: {error}')
+        raise exceptions.TokensError('Недействительный токен Telegram.')
+    state.update(token_check={'digest': digest, 'at': int(time.time())})
+
+
+def run_once(state=None):
+    """Один цикл опроса и уведомления для запуска по расписанию.
+
+    Курсор и последний статус переходят между запусками через
+    STATE_PATH, поэтому повторных уведомлений не будет; без STATE_PATH
+    запуск отклоняется.
+    """
+    if check_tokens():
+        raise exceptions.TokensError('Ошибка небходимых переменных.')
+    if state is None:
+        state = StateStore()
+    if state.path is None:
+        logging.critical('Отсутсвует переменная окружения STATE_PATH')
+        raise exceptions.TokensError(
+            'Для разового запуска нужен STATE_PATH.'
+        )
+
+    from telebot import TeleBot
+
+    bot = TeleBot(token=TELEGRAM_TOKEN)
+    validate_telegram_token(bot, state)
+    tracker = HomeworkTracker(state.get('homeworks'))
+    timestamp, last_status = check_updates(
+        bot, tracker,
+        state.get('current_date', int(time.time()) - RETRY_PERIOD),
+        state.get('last_status', ''), DedupIndex(),
+    )
+    state.update(
+        current_date=timestamp, last_status=last_status,
+        homeworks=dict(tracker.statuses),
     )
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
-    logger.addHandler(logging.StreamHandler(stream=sys.stdout))
-    main()
+    state.flush()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--once']:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s [%(levelname)s] %(message)s',
+        )
+        run_once()
+    else:
+        setup_logging(f'{Path(__file__).stem}.log')
+        if METRICS_PORT:
+            start_http_server()
+        SHUTDOWN.install()
+        try:
+            main()
+        except exceptions.ShutdownRequested:
+            logging.info('Бот остановлен.')
@@ -0,0 +1,61 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = int(os.getenv('POOL_CONNECTIONS', 4))
+POOL_MAXSIZE = int(os.getenv('POOL_MAXSIZE', 32))
+
+_session = None
+_lock = threading.Lock()
+
+
+def create_session(
+    pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+):
+    """Создаёт сессию с пулом keep-alive соединений."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Возвращает общую для всех опросчиков сессию."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def close_session():
+    """Закрывает общую сессию и все соединения пула."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def pool_stats(session=None):
+    """Статистика пулов соединений сессии по хостам."""
+    session = session or get_session()
+    stats = {}
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            idle = pool.pool.queue if pool.pool is not None else []
+            stats[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                'maxsize': pool.pool.maxsize if pool.pool is not None else 0,
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': sum(conn is not None for conn in idle),
+            }
+    return stats
@@ -0,0 +1,179 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import (
+    QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler,
+)
+
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', 60))
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 10))
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+EXTRA_FIELDS = ('tenant', 'homework_id', 'latency', 'exc_class', 'suppressed')
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON.
+
+    Поля tenant, homework_id, latency и exc_class берутся из extra
+    вызова логирования, если они переданы.
+    """
+
+    def format(self, record):
+        """Сериализует запись в JSON."""
+        payload = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'function': record.funcName,
+            'line': record.lineno,
+        }
+        for name in EXTRA_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                payload[name] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает не больше burst одинаковых DEBUG-записей за interval.
+
+    Одинаковыми считаются записи из одной строки кода. Число отброшенных
+    записей попадает в поле suppressed первой записи следующего окна.
+    """
+
+    def __init__(
+        self, interval=LOG_SAMPLE_INTERVAL, burst=LOG_SAMPLE_BURST,
+        clock=time.monotonic,
+    ):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.clock = clock
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """False, если запись надо отбросить."""
+        if record.levelno > logging.DEBUG or self.interval <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = self.clock()
+        with self._lock:
+            started, count, suppressed = self.windows.get(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, count = now, 0
+            if count >= self.burst:
+                self.windows[key] = (started, count, suppressed + 1)
+                return False
+            self.windows[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler, сохраняющий класс исключения и traceback отдельно.
+
+    Стандартный prepare() склеивает traceback с текстом сообщения.
+    """
+
+    def prepare(self, record):
+        """Готовит копию записи к передаче в другой поток."""
+        record = copy.copy(record)
+        if record.exc_info:
+            if getattr(record, 'exc_class', None) is None:
+                record.exc_class = record.exc_info[0].__name__
+            record.exc_text = self.formatter.formatException(record.exc_info)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def fields(tenant=None, homework=None, latency=None, error=None):
+    """Поля структурированной записи для аргумента extra."""
+    if isinstance(homework, dict):
+        homework_id = homework.get('id')
+    else:
+        homework_id = getattr(homework, 'id', None)
+    return {
+        'tenant': tenant,
+        'homework_id': homework_id,
+        'latency': latency,
+        'exc_class': None if error is None else type(error).__name__,
+    }
+
+
+def create_file_handler(filename):
+    """Файловый обработчик с ротацией по размеру или по времени.
+
+    Если задан LOG_ROTATE_WHEN (например, midnight), файл ротируется
+    по времени, иначе — по достижении LOG_MAX_BYTES.
+    """
+    if LOG_ROTATE_WHEN:
+        return TimedRotatingFileHandler(
+            filename, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8',
+        )
+    return RotatingFileHandler(
+        filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8',
+    )
+
+
+def stop_listener(listener):
+    """Дописывает записи из очереди; повторный вызов ничего не делает."""
+    if listener._thread is not None:
+        listener.stop()
+
+
+def setup_logging(
+    filename, level=logging.DEBUG, stream=sys.stdout,
+    stream_level=logging.INFO, logger=None, log_format=LOG_FORMAT,
+):
+    """Неблокирующее логирование через очередь.
+
+    Вызывающий поток только кладёт запись в очередь; форматирование и
+    запись в файл и поток вывода выполняет фоновый QueueListener.
+    Возвращает запущенный listener.
+    """
+    formatter = (
+        JSONFormatter() if log_format == 'json'
+        else logging.Formatter(TEXT_FORMAT)
+    )
+    file_handler = create_file_handler(filename)
+    file_handler.setFormatter(formatter)
+    handlers = [file_handler]
+    if stream is not None:
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setLevel(stream_level)
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(records)
+    queue_handler.setFormatter(logging.Formatter())
+    queue_handler.addFilter(SamplingFilter())
+    logger = logger or logging.getLogger()
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_listener, listener)
+    return listener
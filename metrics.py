@@ -0,0 +1,278 @@
+import bisect
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = os.getenv('METRICS_PORT')
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+
+
+def label_key(labels):
+    """Неизменяемый ключ набора меток."""
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key, extra=()):
+    """Метки в текстовом формате Prometheus."""
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{value}"' for name, value in pairs)
+    return '{' + inner + '}'
+
+
+class Counter:
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Увеличивает счётчик."""
+        key = label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        """Пары (суффикс имени и метки, значение)."""
+        return [
+            (format_labels(key), value)
+            for key, value in list(self.values.items())
+        ]
+
+    def snapshot(self):
+        """Значения метрики в виде словаря."""
+        return {
+            format_labels(key): value for key, value in self.values.items()
+        }
+
+
+class Gauge(Counter):
+    """Значение, которое может как расти, так и убывать."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self.functions = {}
+
+    def set(self, value, **labels):
+        """Устанавливает значение."""
+        self.values[label_key(labels)] = value
+
+    def set_function(self, function, **labels):
+        """Значение будет вычисляться вызовом function при чтении."""
+        self.functions[label_key(labels)] = function
+
+    def samples(self):
+        """Пары (суффикс имени и метки, значение)."""
+        for key, function in self.functions.items():
+            self.values[key] = function()
+        return super().samples()
+
+    def snapshot(self):
+        """Значения метрики в виде словаря."""
+        self.samples()
+        return super().snapshot()
+
+
+class Histogram:
+    """Распределение значений по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Учитывает одно наблюдение."""
+        key = label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [
+                    [0] * (len(self.buckets) + 1), 0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        """Пары (суффикс имени и метки, значение)."""
+        samples = []
+        for key, (counts, total, count) in list(self.values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket
+                samples.append((
+                    '_bucket' + format_labels(key, [('le', bound)]),
+                    cumulative,
+                ))
+            samples.append(('_sum' + format_labels(key), total))
+            samples.append(('_count' + format_labels(key), count))
+        return samples
+
+    def snapshot(self):
+        """Сумма и число наблюдений по каждому набору меток."""
+        return {
+            format_labels(key): {'count': count, 'sum': total}
+            for key, (_, total, count) in self.values.items()
+        }
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """Регистрирует метрику; повторная регистрация возвращает старую."""
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation):
+        """Создаёт или возвращает счётчик."""
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name, documentation):
+        """Создаёт или возвращает измеритель."""
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS):
+        """Создаёт или возвращает гистограмму."""
+        return self.register(Histogram(name, documentation, buckets))
+
+    def snapshot(self):
+        """Текущие значения всех метрик."""
+        return {
+            name: metric.snapshot() for name, metric in self.metrics.items()
+        }
+
+    def exposition(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for suffix, value in metric.samples():
+                lines.append(f'{name}{suffix} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+CALL_LATENCY = REGISTRY.histogram(
+    'homework_call_seconds', 'Длительность вызовов функций бота.'
+)
+ERRORS = REGISTRY.counter(
+    'homework_errors_total', 'Исключения, выброшенные функциями бота.'
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    'homework_delivery_queue_depth', 'Сообщения в очереди отправки.'
+)
+POLL_LAG = REGISTRY.gauge(
+    'homework_poll_lag_seconds', 'Опоздание опроса относительно расписания.'
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    'homework_circuit_state',
+    'Состояние автомата: 0 — замкнут, 1 — пробный, 2 — разомкнут.',
+)
+POLL_CYCLE = REGISTRY.histogram(
+    'homework_poll_cycle_seconds', 'Длительность цикла параллельного опроса.'
+)
+POLL_PARALLELISM = REGISTRY.gauge(
+    'homework_poll_parallelism',
+    'Сумма длительностей запросов цикла к длительности цикла.',
+)
+POLL_SCHEDULE = REGISTRY.gauge(
+    'homework_poll_schedule',
+    'Подписчики со сроком опроса в окне, начинающемся через window секунд.',
+)
+THROTTLE_WAIT = REGISTRY.histogram(
+    'homework_throttle_wait_seconds',
+    'Ожидание токена ограничителя запросов перед запросом к API.',
+)
+
+
+def timed(function_name):
+    """Декоратор: замеряет длительность вызова и считает исключения."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception as error:
+                ERRORS.inc(
+                    function=function_name, exception=type(error).__name__
+                )
+                raise
+            finally:
+                CALL_LATENCY.observe(
+                    time.perf_counter() - start, function=function_name
+                )
+        return wrapper
+    return decorator
+
+
+def metrics_handler(registry=REGISTRY):
+    """Класс обработчика HTTP-запросов к метрикам.
+
+    http.server импортируется только здесь: он заметно удлиняет запуск.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    bound_registry = registry
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Отдаёт метрики: /metrics в формате Prometheus, /snapshot в JSON."""
+
+        registry = bound_registry
+
+        def do_GET(self):
+            """Обработка GET-запроса."""
+            if self.path == '/metrics':
+                body = self.registry.exposition().encode()
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path == '/snapshot':
+                body = json.dumps(self.registry.snapshot()).encode()
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Запросы к метрикам не логируются."""
+
+    return MetricsHandler
+
+
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Запускает HTTP-сервер метрик в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, int(port)), metrics_handler())
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    return server
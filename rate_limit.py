@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import THROTTLE_WAIT
+
+PRACTICUM_RATE = os.getenv('PRACTICUM_RATE')
+PRACTICUM_BURST = float(os.getenv('PRACTICUM_BURST', 10))
+PRIORITY_RESERVE = float(os.getenv('PRIORITY_RESERVE', 2))
+RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB')
+
+
+class TokenBucket:
+    """Общий бюджет запросов к сервису: rate запросов в секунду.
+
+    Ведро вмещает burst токенов и пополняется со скоростью rate. Часть
+    ведра, reserve токенов, доступна только приоритетным запросам: пока
+    приоритетные запросы есть, обычные ждут, а когда их нет, обычные
+    расходуют всё, кроме резерва. Со path состояние ведра хранится в
+    SQLite, и бюджет общий для всех процессов на одной базе.
+    """
+
+    def __init__(
+        self, rate, burst=PRACTICUM_BURST, reserve=PRIORITY_RESERVE,
+        path=RATE_LIMIT_DB, name='practicum', clock=time.time,
+        sleep=time.sleep,
+    ):
+        self.rate = float(rate)
+        self.burst = max(float(burst), reserve + 1)
+        self.reserve = reserve
+        self.name = name
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self.connection = None
+        self._lock = threading.Lock()
+        if path is not None:
+            self.connection = sqlite3.connect(
+                path, timeout=30, isolation_level=None,
+                check_same_thread=False,
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limits ('
+                'name TEXT PRIMARY KEY, '
+                'tokens REAL NOT NULL, '
+                'updated REAL NOT NULL)'
+            )
+
+    def _refill(self, tokens, updated, now):
+        elapsed = max(now - updated, 0)
+        return min(self.burst, tokens + elapsed * self.rate)
+
+    def _take(self, needed, now):
+        with self._lock:
+            self.tokens = self._refill(self.tokens, self.updated, now)
+            self.updated = now
+            if self.tokens >= needed:
+                self.tokens -= 1
+                return 0
+            return (needed - self.tokens) / self.rate
+
+    def _take_shared(self, needed, now):
+        with self._lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.connection.execute(
+                    'SELECT tokens, updated FROM rate_limits WHERE name = ?',
+                    (self.name,),
+                ).fetchone()
+                tokens = self._refill(*row, now) if row else self.burst
+                wait = 0 if tokens >= needed else (
+                    (needed - tokens) / self.rate
+                )
+                if not wait:
+                    tokens -= 1
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO rate_limits '
+                    '(name, tokens, updated) VALUES (?, ?, ?)',
+                    (self.name, tokens, now),
+                )
+                self.connection.execute('COMMIT')
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            return wait
+
+    def acquire(self, priority=False):
+        """Забирает токен, дожидаясь пополнения; возвращает время ожидания.
+
+        Обычному запросу нужно, чтобы в ведре остался резерв, поэтому
+        приоритетные запросы получают токены первыми.
+        """
+        needed = 1 if priority else 1 + self.reserve
+        take = self._take if self.connection is None else self._take_shared
+        waited = 0
+        while True:
+            wait = take(needed, self.clock())
+            if not wait:
+                break
+            self.sleep(wait)
+            waited += wait
+        THROTTLE_WAIT.observe(
+            waited, upstream=self.name,
+            priority='high' if priority else 'normal',
+        )
+        return waited
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        if self.connection is not None:
+            self.connection.close()
+
+
+def create_limiter(path=RATE_LIMIT_DB, rate=PRACTICUM_RATE):
+    """Ограничитель запросов к API Практикума, если задан PRACTICUM_RATE."""
+    if not rate:
+        return None
+    return TokenBucket(rate, path=path)
@@ -0,0 +1,228 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+from homework import RECORD_PATH, decode_response, send_message, token_digest
+from schema import validate_response
+from tenants import Poller, Tenant
+
+RECORDED_HEADERS = ('Retry-After', 'ETag', 'Last-Modified')
+STAGES = ('get_api_answer', 'validate_response', 'settle', 'send_message')
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+class Recorder:
+    """Append-only запись ответов API: одна строка JSON на ответ.
+
+    Вместо токена сохраняется его отпечаток, из заголовков — только
+    нужные для разбора ответа.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, headers, timestamp, response):
+        """Дописывает ответ API на запрос с from_date=timestamp."""
+        token = headers.get('Authorization', '').removeprefix('OAuth ')
+        line = json.dumps({
+            'at': round(time.time(), 3),
+            'tenant': token_digest(token),
+            'from_date': timestamp,
+            'status': response.status_code,
+            'headers': {
+                name: response.headers[name]
+                for name in RECORDED_HEADERS if name in response.headers
+            },
+            'body': response.content.decode('utf-8', 'replace'),
+        }, ensure_ascii=False)
+        with self._lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self):
+        """Закрывает файл записи."""
+        self.file.close()
+
+
+def get_recorder(path=RECORD_PATH):
+    """Общий для потоков процесса Recorder файла path."""
+    with _recorders_lock:
+        if path not in _recorders:
+            _recorders[path] = Recorder(path)
+        return _recorders[path]
+
+
+class RecordedResponse:
+    """Записанный ответ API с интерфейсом requests.Response."""
+
+    __slots__ = (
+        'at', 'tenant', 'from_date', 'status_code', 'headers', 'content',
+    )
+
+    def __init__(self, at, tenant, from_date, status, headers, body):
+        self.at = at
+        self.tenant = tenant
+        self.from_date = from_date
+        self.status_code = status
+        self.headers = headers
+        self.content = body.encode()
+
+    @property
+    def text(self):
+        """Тело ответа строкой."""
+        return self.content.decode()
+
+    def json(self):
+        """Тело ответа как JSON."""
+        return json.loads(self.content)
+
+
+def read_recording(path):
+    """Ответы из записи в порядке записи."""
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield RecordedResponse(**json.loads(line))
+
+
+class NullBot:
+    """Бот, который запоминает сообщения вместо отправки."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id, text):
+        """Запоминает сообщение."""
+        self.messages.append(text)
+
+
+class StageStats:
+    """Число вызовов, время и ошибки каждой стадии конвейера."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.errors = Counter()
+
+    def run(self, stage, function, *args):
+        """Вызывает стадию и учитывает её время; ошибка выбрасывается."""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        except Exception as error:
+            self.errors[(stage, type(error).__name__)] += 1
+            raise
+        finally:
+            self.calls[stage] += 1
+            self.seconds[stage] += time.perf_counter() - start
+
+    def throughput(self, stage):
+        """Вызовов стадии в секунду её собственного времени."""
+        seconds = self.seconds[stage]
+        return self.calls[stage] / seconds if seconds else float('inf')
+
+    def report(self):
+        """Строки отчёта по стадиям."""
+        lines = []
+        for stage in STAGES:
+            lines.append(
+                f'{stage}: {self.calls[stage]} вызовов, '
+                f'{self.seconds[stage] * 1000:.1f} мс, '
+                f'{self.throughput(stage):.0f} в секунду'
+            )
+        for (stage, error), count in sorted(self.errors.items()):
+            lines.append(f'  {stage}: {error} x{count}')
+        return lines
+
+
+def settle(response, tenant, poller, stats):
+    """Сообщения подписчику tenant по записанному ответу."""
+    try:
+        answer = stats.run('get_api_answer', decode_response, response)
+        checked = stats.run('validate_response', validate_response, answer)
+    except Exception as error:
+        return poller.settle(tenant, error=error)
+    return stats.run(
+        'settle', poller.settle, tenant, checked.homeworks,
+        checked.current_date,
+    )
+
+
+def replay(responses, bot=None, speed=None, stats=None, poller=None):
+    """Прогоняет записанные ответы через конвейер бота.
+
+    get_api_answer без сети сводится к проверке кода ответа и разбору
+    JSON. Ответы группируются по отпечатку токена: у каждого подписчика
+    свои статусы работ и последнее сообщение, а сообщения определяет
+    Poller.settle, как при опросе. При speed=None ответы подаются без
+    пауз, иначе — с интервалами из записи, ускоренными в speed раз.
+    Ошибки стадий учитываются в статистике, а прогон продолжается.
+    """
+    bot = bot or NullBot()
+    stats = stats or StageStats()
+    poller = poller or Poller()
+    subscribers = {}
+    started = first_at = None
+    for response in responses:
+        if speed is not None:
+            if first_at is None:
+                first_at, started = response.at, time.monotonic()
+            delay = (
+                (response.at - first_at) / speed
+                - (time.monotonic() - started)
+            )
+            if delay > 0:
+                time.sleep(delay)
+        tenant = subscribers.get(response.tenant)
+        if tenant is None:
+            tenant = subscribers[response.tenant] = Tenant(
+                response.tenant, response.tenant
+            )
+        for message in settle(response, tenant, poller, stats):
+            try:
+                stats.run('send_message', send_message, bot, message)
+            except Exception as error:
+                logging.debug(f'Сбой при воспроизведении: {error}')
+    return stats
+
+
+def run(args):
+    """Воспроизводит запись и печатает пропускную способность стадий."""
+    responses = list(read_recording(args.path))
+    bot = NullBot()
+    stats = StageStats()
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        replay(responses, bot, args.speed, stats)
+    elapsed = time.perf_counter() - started
+    print(f'ответов: {len(responses) * args.repeat}, '
+          f'длительность: {elapsed:.3f} с, '
+          f'{len(responses) * args.repeat / elapsed:.0f} ответов в секунду')
+    for line in stats.report():
+        print(line)
+    if args.messages:
+        for message in bot.messages:
+            print(message)
+
+
+def parse_args(argv=None):
+    """Параметры воспроизведения из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Воспроизведение записанных ответов API без сети.'
+    )
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--messages', action='store_true')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    run(parse_args())
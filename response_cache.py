@@ -0,0 +1,107 @@
+import hashlib
+import re
+import threading
+
+from homework import decode_response, fetch_homework_statuses, make_headers
+from schema import validate_response
+
+CURRENT_DATE_PATTERN = re.compile(rb'"current_date"\s*:\s*(-?\d+)')
+
+
+def fingerprint(body):
+    """Хэш тела ответа без изменчивого поля current_date и его значение."""
+    match = CURRENT_DATE_PATTERN.search(body)
+    if match is None:
+        return None, None
+    normalized = body[:match.start()] + body[match.end():]
+    digest = hashlib.blake2b(normalized, digest_size=16).digest()
+    return digest, int(match.group(1))
+
+
+class CacheEntry:
+    """Проверенный ответ API для одного токена и курсора."""
+
+    __slots__ = (
+        'from_date', 'digest', 'etag', 'last_modified',
+        'homeworks', 'current_date',
+    )
+
+    def __init__(
+        self, from_date, digest, etag, last_modified, homeworks, current_date
+    ):
+        self.from_date = from_date
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.homeworks = homeworks
+        self.current_date = current_date
+
+    def validators(self):
+        """Заголовки условного запроса."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Кэш ответов API по ключу (токен, from_date).
+
+    Для каждого токена хранится одна запись, поэтому объём кэша
+    ограничен числом подписчиков.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, entry, parameters):
+        """Возвращает (homeworks, current_date) из кэша, если ответ тот же."""
+        if parameters.status_code == 304:
+            return entry.homeworks, entry.current_date
+        if parameters.status_code != 200:
+            return None
+        digest, current_date = fingerprint(parameters.content)
+        if digest is not None and digest == entry.digest:
+            return entry.homeworks, current_date
+        return None
+
+    def get_homeworks(self, token, from_date, session=None):
+        """Запрашивает API, пропуская разбор и проверку неизменных ответов."""
+        entry = self.entries.get(token)
+        if entry is not None and entry.from_date != from_date:
+            entry = None
+        headers = make_headers(token)
+        if entry is not None:
+            headers.update(entry.validators())
+        parameters = fetch_homework_statuses(headers, from_date, session)
+        if entry is not None:
+            cached = self.lookup(entry, parameters)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached
+        with self._lock:
+            self.misses += 1
+        response = validate_response(decode_response(parameters))
+        self.entries[token] = CacheEntry(
+            from_date,
+            fingerprint(parameters.content)[0],
+            parameters.headers.get('ETag'),
+            parameters.headers.get('Last-Modified'),
+            response.homeworks,
+            response.current_date,
+        )
+        return response.homeworks, response.current_date
+
+    def stats(self):
+        """Счётчики попаданий и промахов кэша."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self.entries),
+        }
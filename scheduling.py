@@ -0,0 +1,247 @@
+import math
+import os
+import random
+
+import exceptions
+from homework import RETRY_PERIOD
+from sharding import hash_key
+
+REVIEWING_PERIOD = int(os.getenv('REVIEWING_PERIOD', 120))
+MAX_IDLE_PERIOD = int(os.getenv('MAX_IDLE_PERIOD', 3600))
+ERROR_PERIOD = int(os.getenv('ERROR_PERIOD', 60))
+MAX_ERROR_PERIOD = int(os.getenv('MAX_ERROR_PERIOD', 3600))
+JITTER = 0.1
+POLL_SCHEDULER = os.getenv('POLL_SCHEDULER', 'adaptive')
+WHEEL_TICK = float(os.getenv('WHEEL_TICK', 1))
+SCHEDULE_BUCKETS = 10
+
+
+class FixedScheduler:
+    """Опрос через постоянный интервал, как в main()."""
+
+    def __init__(self, period=RETRY_PERIOD):
+        self.period = period
+
+    def next_delay(self, tenant, homeworks=None, error=None):
+        """Задержка до следующего опроса подписчика."""
+        return self.period
+
+
+class AdaptiveScheduler:
+    """Интервал опроса в зависимости от статуса работы и ошибок.
+
+    Пока работа на ревью, подписчик опрашивается каждые reviewing секунд.
+    Пустые ответы и ошибки запроса удваивают интервал до max_idle и
+    max_error соответственно, а Retry-After от API соблюдается как есть.
+    """
+
+    def __init__(
+        self, period=RETRY_PERIOD, reviewing=REVIEWING_PERIOD,
+        max_idle=MAX_IDLE_PERIOD, error_period=ERROR_PERIOD,
+        max_error=MAX_ERROR_PERIOD, jitter=JITTER, rng=random.random,
+    ):
+        self.period = period
+        self.reviewing = reviewing
+        self.max_idle = max_idle
+        self.error_period = error_period
+        self.max_error = max_error
+        self.jitter = jitter
+        self.rng = rng
+
+    def spread(self, delay):
+        """Добавляет к задержке случайный разброс ±jitter."""
+        return delay * (1 + self.jitter * (2 * self.rng() - 1))
+
+    def error_delay(self, tenant, error):
+        """Задержка после неудачного опроса."""
+        tenant.failures += 1
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return max(retry_after, self.error_period)
+        if isinstance(
+            error, (exceptions.RequestError, exceptions.WrongStatusError)
+        ):
+            return self.spread(min(
+                self.error_period * 2 ** (tenant.failures - 1),
+                self.max_error,
+            ))
+        return self.spread(self.period)
+
+    def next_delay(self, tenant, homeworks=None, error=None):
+        """Задержка до следующего опроса подписчика."""
+        if error is not None:
+            return self.error_delay(tenant, error)
+        tenant.failures = 0
+        if homeworks:
+            tenant.idle_polls = 0
+        else:
+            tenant.idle_polls += 1
+        if tenant.homework_status == 'reviewing':
+            return self.spread(self.reviewing)
+        return self.spread(min(
+            self.period * 2 ** max(tenant.idle_polls - 1, 0), self.max_idle
+        ))
+
+
+def due_tenants(tenants, now):
+    """Подписчики, которых пора опросить."""
+    return [tenant for tenant in tenants if tenant.next_poll <= now]
+
+
+def next_wakeup(tenants, now, default=RETRY_PERIOD):
+    """Сколько секунд можно спать до ближайшего опроса."""
+    if not tenants:
+        return default
+    return max(0, min(tenant.next_poll for tenant in tenants) - now)
+
+
+def phase(tenant, period=RETRY_PERIOD):
+    """Постоянное смещение опроса подписчика внутри периода.
+
+    Смещение берётся из хэша токена и чата, поэтому подписчики
+    равномерно распределены по периоду и сохраняют смещение после
+    перезапуска.
+    """
+    key = hash_key(f'{tenant.token}:{tenant.chat_id}')
+    return key / 2 ** 64 * period
+
+
+def stagger(tenants, now, period=RETRY_PERIOD):
+    """Разносит первый опрос ещё не опрашивавшихся подписчиков по периоду."""
+    for tenant in tenants:
+        if not tenant.next_poll:
+            tenant.next_poll = now + phase(tenant, period)
+
+
+def anchored(planned, delay, now):
+    """Срок следующего опроса, отсчитанный от запланированного.
+
+    Задержки цикла не накапливаются: опоздание одного опроса не сдвигает
+    следующие. Если опрос опоздал больше чем на delay, пропущенные сроки
+    отбрасываются, а смещение подписчика внутри периода сохраняется.
+    """
+    if not planned or delay <= 0:
+        return now + delay
+    following = planned + delay
+    if following <= now:
+        following += delay * math.ceil((now - following) / delay + 1e-9)
+    return following
+
+
+class TimingWheel:
+    """Хэшированное колесо таймеров для сроков опроса подписчиков.
+
+    Колесо из slots ячеек по tick секунд; подписчик попадает в ячейку
+    своего срока next_poll за O(1), а сроки дальше одного оборота ждут
+    в ячейке следующих оборотов. expire() просматривает только ячейки,
+    пройденные с прошлого вызова, так что подписчик обрабатывается за
+    O(1) на оборот, а опоздание срока не превышает tick.
+    """
+
+    def __init__(self, tick=WHEEL_TICK, slots=None, period=RETRY_PERIOD):
+        self.tick = tick
+        self.slots = [
+            {} for _ in range(slots or max(1, math.ceil(period / tick)))
+        ]
+        self.entries = {}
+        self.cursor = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def reset(self, tenants):
+        """Заново ставит на колесо набор подписчиков."""
+        for slot in self.slots:
+            slot.clear()
+        self.entries.clear()
+        self.cursor = None
+        for tenant in tenants:
+            self.schedule(tenant)
+
+    @property
+    def horizon(self):
+        """Длительность одного оборота колеса, в секундах."""
+        return self.tick * len(self.slots)
+
+    def _index(self, deadline):
+        return int(deadline // self.tick)
+
+    def schedule(self, tenant):
+        """Ставит подписчика на срок tenant.next_poll."""
+        self.cancel(tenant)
+        index = self._index(tenant.next_poll)
+        if self.cursor is not None and index < self.cursor:
+            index = self.cursor
+        self.slots[index % len(self.slots)][tenant] = tenant.next_poll
+        self.entries[tenant] = index
+
+    def cancel(self, tenant):
+        """Снимает подписчика с колеса."""
+        index = self.entries.pop(tenant, None)
+        if index is not None:
+            del self.slots[index % len(self.slots)][tenant]
+
+    def expire(self, now):
+        """Подписчики со сроком не позже now; они снимаются с колеса."""
+        current = self._index(now)
+        if self.cursor is None:
+            self.cursor = min(self.entries.values(), default=current)
+        first = self.cursor
+        self.cursor = current
+        count = len(self.slots)
+        due = []
+        for index in range(first, min(current, first + count - 1) + 1):
+            slot = self.slots[index % count]
+            for tenant, deadline in list(slot.items()):
+                if deadline <= now:
+                    del slot[tenant]
+                    del self.entries[tenant]
+                    due.append(tenant)
+        return due
+
+    def next_wakeup(self, now, default=RETRY_PERIOD):
+        """Сколько секунд можно спать до ближайшего срока."""
+        if not self.entries:
+            return default
+        current = self._index(now)
+        if self.cursor is not None:
+            current = min(current, self.cursor)
+        count = len(self.slots)
+        for index in range(current, current + count):
+            slot = self.slots[index % count]
+            soonest = min(
+                (
+                    deadline for deadline in slot.values()
+                    if self._index(deadline) <= index
+                ),
+                default=None,
+            )
+            if soonest is not None:
+                return max(0, soonest - now)
+        return max(0, min(
+            slot_deadline for slot in self.slots
+            for slot_deadline in slot.values()
+        ) - now)
+
+    def histogram(self, now, buckets=SCHEDULE_BUCKETS, horizon=None):
+        """Число подписчиков со сроком в каждом из buckets окон horizon.
+
+        Просроченные сроки попадают в первое окно, а сроки дальше
+        горизонта не учитываются.
+        """
+        horizon = horizon or self.horizon
+        counts = [0] * buckets
+        for slot in self.slots:
+            for deadline in slot.values():
+                offset = max(deadline - now, 0)
+                if offset < horizon:
+                    counts[int(offset / horizon * buckets)] += 1
+        return counts
+
+
+def create_scheduler(name=POLL_SCHEDULER):
+    """Планировщик опроса по имени из настроек."""
+    schedulers = {'adaptive': AdaptiveScheduler, 'fixed': FixedScheduler}
+    if name not in schedulers:
+        raise ValueError(f'Неизвестный планировщик опроса: {name}')
+    return schedulers[name]()
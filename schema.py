@@ -0,0 +1,116 @@
+import logging
+
+import exceptions
+from logging_setup import fields
+from homework import HOMEWORK_VERDICTS
+from metrics import timed
+
+
+class Homework:
+    """Проверенная запись о домашней работе."""
+
+    __slots__ = (
+        'id', 'homework_name', 'status', 'reviewer_comment',
+        'date_updated', 'lesson_name',
+    )
+
+    def __init__(
+        self, id, homework_name, status, reviewer_comment=None,
+        date_updated=None, lesson_name=None,
+    ):
+        self.id = id
+        self.homework_name = homework_name
+        self.status = status
+        self.reviewer_comment = reviewer_comment
+        self.date_updated = date_updated
+        self.lesson_name = lesson_name
+
+    def __repr__(self):
+        return f'Homework({self.homework_name!r}, {self.status!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    @property
+    def key(self):
+        """Ключ работы: id, а при его отсутствии название."""
+        return str(self.id or self.homework_name)
+
+
+class StatusResponse:
+    """Проверенный ответ API."""
+
+    __slots__ = ('homeworks', 'current_date', 'rejected')
+
+    def __init__(self, homeworks, current_date, rejected=0):
+        self.homeworks = homeworks
+        self.current_date = current_date
+        self.rejected = rejected
+
+
+def validate_homework(homework):
+    """Проверяет запись о работе и возвращает Homework.
+
+    Ошибки те же, что у parse_status().
+    """
+    try:
+        homework_name = homework['homework_name']
+    except (KeyError, TypeError):
+        raise KeyError('В ответе отсутствует название работы.')
+    try:
+        status = homework['status']
+    except KeyError:
+        raise KeyError('В ответе отсутствует статус работы.')
+    if status not in HOMEWORK_VERDICTS:
+        raise ValueError('Передан неизвестный статус работы.')
+    get = homework.get
+    return Homework(
+        get('id'), homework_name, status, get('reviewer_comment'),
+        get('date_updated'), get('lesson_name'),
+    )
+
+
+def validate_homeworks(homeworks):
+    """Проверенные записи о работах; некорректные пропускаются."""
+    valid = []
+    for homework in homeworks:
+        try:
+            valid.append(validate_homework(homework))
+        except (KeyError, ValueError) as error:
+            logging.error(
+                f'Пропущена работа {homework!r}: {error}',
+                extra=fields(homework=homework, error=error),
+            )
+    return valid
+
+
+@timed('validate_response')
+def validate_response(response):
+    """Проверяет ответ API за один проход и возвращает StatusResponse.
+
+    Ошибки верхнего уровня те же, что у check_response(). Некорректные
+    записи о работах логируются и пропускаются, как в HomeworkTracker.
+    """
+    if not isinstance(response, dict):
+        raise TypeError('Поступили данные вида, отличного от словаря.')
+    try:
+        homeworks = response['homeworks']
+    except KeyError:
+        raise KeyError('Ошибка ключа homeworks.')
+    if not isinstance(homeworks, list):
+        raise TypeError('Поступили данные типа, отличного от list.')
+    try:
+        current_date = response['current_date']
+    except KeyError:
+        raise exceptions.NoCurrentDateError('Ключ current_date отсутствует.')
+    if not isinstance(current_date, int):
+        raise exceptions.NotIntCurrentDateError(
+            'Тип ключа current_date отличен от int'
+        )
+    valid = validate_homeworks(homeworks)
+    return StatusResponse(valid, current_date, len(homeworks) - len(valid))
@@ -0,0 +1,162 @@
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import time
+
+LEASE_TTL = int(os.getenv('LEASE_TTL', 30))
+HEARTBEAT_PERIOD = int(os.getenv('HEARTBEAT_PERIOD', 10))
+VIRTUAL_NODES = 64
+
+
+def hash_key(key):
+    """Положение ключа на кольце."""
+    return int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """Консистентное хэширование ключей по воркерам.
+
+    Каждый воркер занимает на кольце VIRTUAL_NODES точек, поэтому при
+    появлении или уходе воркера переезжает лишь около 1/N ключей.
+    """
+
+    def __init__(self, nodes=(), replicas=VIRTUAL_NODES):
+        points = sorted(
+            (hash_key(f'{node}#{index}'), node)
+            for node in nodes for index in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        """Воркер, которому принадлежит ключ."""
+        if not self.nodes:
+            return None
+        index = bisect.bisect(self.hashes, hash_key(key)) % len(self.hashes)
+        return self.nodes[index]
+
+
+def default_worker_id():
+    """Имя воркера: хост и номер процесса."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Coordinator:
+    """Аренда места воркера в таблице SQLite рядом с реестром подписок.
+
+    Воркер продлевает аренду в heartbeat(); воркеры, не продлившие её
+    за lease_ttl секунд, считаются ушедшими.
+    """
+
+    def __init__(
+        self, path, worker_id=None, lease_ttl=LEASE_TTL, clock=time.time
+    ):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS workers ('
+            'worker_id TEXT PRIMARY KEY, '
+            'expires REAL NOT NULL)'
+        )
+        self.connection.commit()
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.clock = clock
+        self.workers = ()
+        self.ring = HashRing()
+
+    def heartbeat(self):
+        """Продлевает аренду; True, если состав воркеров изменился."""
+        now = self.clock()
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO workers (worker_id, expires) VALUES (?, ?) '
+                'ON CONFLICT (worker_id) DO UPDATE SET expires = '
+                'excluded.expires',
+                (self.worker_id, now + self.lease_ttl),
+            )
+            self.connection.execute(
+                'DELETE FROM workers WHERE expires < ?', (now,)
+            )
+        workers = tuple(
+            row[0] for row in self.connection.execute(
+                'SELECT worker_id FROM workers ORDER BY worker_id'
+            )
+        )
+        if workers == self.workers:
+            return False
+        logging.info(f'Воркеры: {", ".join(workers)}')
+        self.workers = workers
+        self.ring = HashRing(workers)
+        return True
+
+    def owns(self, tenant):
+        """Подписчик достаётся этому воркеру.
+
+        Шардирование идёт по токену: подписчики с одним токеном остаются
+        в одном процессе и делят кэш ответов.
+        """
+        return self.ring.node_for(tenant.token) == self.worker_id
+
+    def leave(self):
+        """Освобождает аренду, чтобы остальные сразу забрали подписчиков."""
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM workers WHERE worker_id = ?', (self.worker_id,)
+            )
+        self.connection.close()
+
+
+class Shard:
+    """Подписчики реестра, принадлежащие текущему воркеру.
+
+    Без координатора воркер единственный и ведёт всех подписчиков.
+    """
+
+    def __init__(self, registry, coordinator, period=HEARTBEAT_PERIOD):
+        self.registry = registry
+        self.coordinator = coordinator
+        self.period = period
+        self.tenants = []
+        self.checked_at = None
+
+    def refresh(self, now):
+        """Продлевает аренду и перераспределяет подписчиков.
+
+        Возвращает True, если набор подписчиков воркера изменился.
+        Состояние здесь не сохраняется: цикл опроса сохраняет его после
+        каждого опроса, а запись всего старого набора затёрла бы курсоры,
+        которые новый владелец уже сдвинул.
+        """
+        if self.checked_at is not None and (
+            self.coordinator is None or now - self.checked_at < self.period
+        ):
+            return False
+        self.checked_at = now
+        if self.coordinator is not None and not self.coordinator.heartbeat():
+            return False
+        self.tenants = [
+            tenant for tenant in self.registry.load() if self.owns(tenant)
+        ]
+        logging.info(f'Загружено подписок: {len(self.tenants)}')
+        return True
+
+    def owns(self, tenant):
+        """Подписчик достаётся этому воркеру."""
+        return self.coordinator is None or self.coordinator.owns(tenant)
+
+    def timeout(self, timeout):
+        """Сон не дольше интервала продления аренды."""
+        if self.coordinator is None:
+            return timeout
+        return min(timeout, self.period)
+
+    def close(self):
+        """Сохраняет подписчиков и освобождает аренду воркера."""
+        self.registry.save(self.tenants)
+        if self.coordinator is not None:
+            self.coordinator.leave()
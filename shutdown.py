@@ -0,0 +1,48 @@
+import logging
+import os
+import signal
+from contextlib import contextmanager
+
+import exceptions
+
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 10))
+
+
+class GracefulShutdown:
+    """Остановка по SIGTERM и SIGINT без потери состояния.
+
+    Сигнал прерывает только ожидание между циклами: запрос к API или
+    отправка сообщения, начатые до сигнала, доводятся до конца, а
+    ShutdownRequested выбрасывается при входе в следующее ожидание.
+    """
+
+    def __init__(self):
+        self.requested = False
+        self.waiting = False
+
+    def handle(self, signum, frame):
+        """Обработчик сигнала."""
+        logging.info(f'Получен сигнал {signal.Signals(signum).name}')
+        self.requested = True
+        if self.waiting:
+            raise exceptions.ShutdownRequested()
+
+    def install(self, signals=(signal.SIGTERM, signal.SIGINT)):
+        """Назначает обработчики сигналов; вызывается из главного потока."""
+        for signum in signals:
+            signal.signal(signum, self.handle)
+        return self
+
+    @contextmanager
+    def interruptible(self):
+        """Блок ожидания, который сигнал остановки прерывает сразу."""
+        self.waiting = True
+        try:
+            if self.requested:
+                raise exceptions.ShutdownRequested()
+            yield
+        finally:
+            self.waiting = False
+
+
+SHUTDOWN = GracefulShutdown()
@@ -0,0 +1,309 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from functools import partial
+from itertools import accumulate
+
+import exceptions
+
+TENANTS_SNAPSHOT = os.getenv('TENANTS_SNAPSHOT')
+CHECKPOINT_BYTES = int(os.getenv('CHECKPOINT_BYTES', 4 * 1024 * 1024))
+
+MAGIC = b'HWTS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIIq')
+TENANT = struct.Struct('<qIIIIII')
+FRAME = struct.Struct('<II')
+
+
+def read_uint32(buffer, start, count):
+    """Массив uint32 little-endian из буфера.
+
+    На little-endian массив читается из буфера без копирования.
+    """
+    if sys.byteorder == 'little':
+        view = memoryview(buffer)[start:start + count * 4]
+        return view.cast('I') if len(view) == count * 4 else ()
+    values = array('I')
+    values.frombytes(buffer[start:start + count * values.itemsize])
+    values.byteswap()
+    return values
+
+
+def write_uint32(values):
+    """Байты массива uint32 в little-endian."""
+    values = array('I', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+class StringTable(dict):
+    """Строки снимка по номерам; декодируются из буфера при обращении."""
+
+    __slots__ = ('buffer', 'start', 'offsets')
+
+    def __init__(self, buffer, start, offsets):
+        super().__init__()
+        self.buffer = buffer
+        self.start = start
+        self.offsets = offsets
+
+    def __missing__(self, index):
+        value = self[index] = self.buffer[
+            self.start + self.offsets[index]:
+            self.start + self.offsets[index + 1]
+        ].decode()
+        return value
+
+
+def encode_snapshot(states, subscriptions=None):
+    """Снимок состояний подписчиков в формате версии VERSION.
+
+    Заголовок с версией списка подписок subscriptions, затем записи
+    подписчиков фиксированной длины, пары (работа, статус) всех
+    подписчиков, смещения строк и сами строки в UTF-8. Повторяющиеся
+    строки — статусы, последние сообщения, языки — хранятся один раз.
+    """
+    strings = {}
+
+    def intern(value):
+        return strings.setdefault(value, len(strings))
+
+    tenants = bytearray()
+    entries = []
+    for (token, chat_id), state in states:
+        from_date, last_status, statuses, language = state
+        first = len(entries) // 2
+        statuses = materialize(statuses)
+        for key, status in statuses.items():
+            entries.extend((intern(key), intern(status)))
+        tenants += TENANT.pack(
+            from_date, intern(token), intern(chat_id), intern(last_status),
+            intern(language), first, len(statuses),
+        )
+    blob = [value.encode() for value in strings]
+    return b''.join((
+        HEADER.pack(
+            MAGIC, VERSION, 0, len(tenants) // TENANT.size,
+            len(entries) // 2, len(strings), 0,
+            -1 if subscriptions is None else subscriptions,
+        ),
+        bytes(tenants), write_uint32(entries),
+        write_uint32(accumulate(map(len, blob), initial=0)),
+        *blob,
+    ))
+
+
+def decode_snapshot(buffer):
+    """Версия списка подписок и состояния подписчиков из снимка.
+
+    Состояния — {(token, chat_id): (from_date, last_status, статусы,
+    язык)}. Массивы читаются прямо из буфера, строки декодируются при
+    первом обращении, а статусы работ не собираются в словари: вместо
+    словаря возвращается функция, которая строит его при обращении.
+    Поэтому буфер должен оставаться открытым, пока состояния нужны.
+    """
+    if len(buffer) < HEADER.size:
+        raise exceptions.SnapshotError('Снимок состояния обрезан.')
+    magic, version, _, count, entry_count, string_count, _, subscriptions = (
+        HEADER.unpack_from(buffer)
+    )
+    if magic != MAGIC or version != VERSION:
+        raise exceptions.SnapshotError(
+            f'Неизвестный формат снимка: {magic!r} версии {version}'
+        )
+    position = HEADER.size + count * TENANT.size
+    entries = read_uint32(buffer, position, entry_count * 2)
+    position += entry_count * 2 * 4
+    offsets = read_uint32(buffer, position, string_count + 1)
+    position += (string_count + 1) * 4
+    if (
+        len(entries) != entry_count * 2 or len(offsets) != string_count + 1
+        or len(buffer) != position + offsets[-1]
+    ):
+        raise exceptions.SnapshotError('Снимок состояния обрезан.')
+    strings = StringTable(buffer, position, offsets)
+    states = {}
+    records = memoryview(buffer)[HEADER.size:HEADER.size + count * TENANT.size]
+    for from_date, token, chat_id, last_status, language, first, size in (
+        TENANT.iter_unpack(records)
+    ):
+        states[strings[token], strings[chat_id]] = (
+            from_date, strings[last_status],
+            partial(decode_statuses, entries, strings, first, size)
+            if size else {},
+            strings[language],
+        )
+    return None if subscriptions < 0 else subscriptions, states
+
+
+def decode_statuses(entries, strings, first, size):
+    """Статусы работ подписчика из пар снимка."""
+    start, stop = first * 2, (first + size) * 2
+    return dict(zip(
+        map(strings.__getitem__, entries[start:stop:2]),
+        map(strings.__getitem__, entries[start + 1:stop:2]),
+    ))
+
+
+def materialize(statuses):
+    """Словарь статусов, в том числе ещё не прочитанных из снимка."""
+    return statuses() if callable(statuses) else statuses
+
+
+def read_frames(path):
+    """Записи журнала; повреждённый хвост после сбоя отбрасывается."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as wal:
+        data = wal.read()
+    position = 0
+    while position + FRAME.size <= len(data):
+        length, checksum = FRAME.unpack_from(data, position)
+        payload = data[position + FRAME.size:position + FRAME.size + length]
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            logging.warning(f'Отброшен повреждённый хвост журнала {path}')
+            return
+        yield json.loads(payload)
+        position += FRAME.size + length
+
+
+class TenantSnapshot:
+    """Состояние подписчиков в бинарном снимке и журнале изменений.
+
+    При запуске снимок читается через mmap, а поверх него применяется
+    журнал; отображение остаётся открытым, пока из него читаются
+    строки и статусы. Сохранение дописывает в журнал только
+    изменившихся подписчиков. subscriptions — версия списка подписок
+    реестра, с которой совпадают состояния, или None, если она
+    неизвестна. Когда журнал превышает checkpoint_bytes, он
+    переименовывается в .wal.old, а новый снимок пишется в фоновом
+    потоке, не останавливая опрос; после записи снимка старый журнал
+    удаляется. Записи журнала содержат полное состояние подписчика,
+    поэтому повторное применение .wal.old после сбоя безопасно.
+    """
+
+    def __init__(
+        self, path=TENANTS_SNAPSHOT, checkpoint_bytes=CHECKPOINT_BYTES,
+    ):
+        self.path = path
+        self.wal_path = f'{path}.wal'
+        self.old_wal_path = f'{path}.wal.old'
+        self.checkpoint_bytes = checkpoint_bytes
+        self.states = None
+        self.subscriptions = None
+        self.wal = None
+        self._writer = None
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return None, {}
+        with open(self.path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return decode_snapshot(buffer)
+
+    def load(self):
+        """Состояния подписчиков: {(token, chat_id): (from_date, ...)}."""
+        if self.states is None:
+            self.subscriptions, self.states = self._read_snapshot()
+            for path in (self.old_wal_path, self.wal_path):
+                for token, chat_id, *state in read_frames(path):
+                    self.states[token, chat_id] = tuple(state)
+            self.wal = open(self.wal_path, 'ab')
+        return self.states
+
+    def retain(self, keys):
+        """Забывает подписчиков, которых больше нет в реестре."""
+        for key in set(self.load()) - set(keys):
+            del self.states[key]
+
+    def append(self, tenants):
+        """Дописывает состояния подписчиков в журнал одной записью."""
+        states = self.load()
+        frames = []
+        for tenant in tenants:
+            state = (
+                tenant.from_date, tenant.last_status,
+                dict(tenant.tracker.statuses), tenant.language,
+            )
+            states[tenant.token, tenant.chat_id] = state
+            payload = json.dumps(
+                [tenant.token, tenant.chat_id, *state],
+                ensure_ascii=False, separators=(',', ':'),
+            ).encode()
+            frames.append(FRAME.pack(len(payload), zlib.crc32(payload)))
+            frames.append(payload)
+        if not frames:
+            return
+        self.wal.write(b''.join(frames))
+        self.wal.flush()
+        os.fsync(self.wal.fileno())
+        if self.wal.tell() >= self.checkpoint_bytes:
+            self.checkpoint()
+
+    def _write(self, states, subscriptions):
+        temporary = f'{self.path}.tmp'
+        try:
+            with open(temporary, 'wb') as file:
+                file.write(encode_snapshot(states, subscriptions))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+            os.remove(self.old_wal_path)
+        except OSError as error:
+            logging.error(f'Не удалось записать снимок {self.path}: {error}')
+
+    def _rotate(self):
+        self.wal.close()
+        if os.path.exists(self.old_wal_path):
+            with open(self.old_wal_path, 'ab') as old, open(
+                self.wal_path, 'rb'
+            ) as wal:
+                old.write(wal.read())
+                old.flush()
+                os.fsync(old.fileno())
+            os.remove(self.wal_path)
+        else:
+            os.replace(self.wal_path, self.old_wal_path)
+        self.wal = open(self.wal_path, 'ab')
+
+    def checkpoint(self, wait=False):
+        """Пишет новый снимок и начинает новый журнал.
+
+        Пока предыдущий снимок пишется, новый не начинается. Если
+        предыдущий снимок записать не удалось, журнал дописывается
+        к .wal.old, и его записи не теряются.
+        """
+        if self._writer is not None and self._writer.is_alive():
+            if not wait:
+                return
+            self._writer.join()
+        states = list(self.load().items())
+        self._rotate()
+        self._writer = threading.Thread(
+            target=self._write, args=(states, self.subscriptions),
+            name='snapshot', daemon=True,
+        )
+        self._writer.start()
+        if wait:
+            self._writer.join()
+
+    def close(self):
+        """Пишет итоговый снимок и закрывает журнал."""
+        if self.wal is None:
+            return
+        self.checkpoint(wait=True)
+        self.wal.close()
+        self.wal = None
+
+
+def create_snapshot(path=TENANTS_SNAPSHOT):
+    """Хранилище снимков, если задан TENANTS_SNAPSHOT."""
+    return None if not path else TenantSnapshot(path)
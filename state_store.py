@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+
+STATE_PATH = os.getenv('STATE_PATH')
+COMPACT_AFTER = int(os.getenv('STATE_COMPACT_AFTER', 1000))
+
+
+class StateStore:
+    """Состояние бота в append-only журнале JSON-строк.
+
+    Каждая строка журнала содержит изменённые с прошлого сброса ключи.
+    Журнал читается при первом обращении, изменения дописываются одной
+    строкой в flush(), а после COMPACT_AFTER строк журнал сжимается
+    в одну. Без пути состояние хранится только в памяти.
+    """
+
+    def __init__(self, path=STATE_PATH, compact_after=COMPACT_AFTER):
+        self.path = path
+        self.compact_after = compact_after
+        self._data = None
+        self._dirty = {}
+        self._lines = 0
+
+    def _load(self):
+        self._data = {}
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    self._data.update(json.loads(line))
+                except ValueError:
+                    logging.warning(
+                        f'Пропущена повреждённая запись журнала {self.path}'
+                    )
+                self._lines += 1
+
+    @property
+    def data(self):
+        """Текущее состояние, прочитанное из журнала при первом обращении."""
+        if self._data is None:
+            self._load()
+        return self._data
+
+    def get(self, key, default=None):
+        """Значение ключа состояния."""
+        return self.data.get(key, default)
+
+    def update(self, **values):
+        """Запоминает изменённые значения до следующего flush()."""
+        for key, value in values.items():
+            if self.data.get(key) != value:
+                self.data[key] = value
+                self._dirty[key] = value
+
+    def flush(self):
+        """Дописывает накопленные изменения в журнал."""
+        if not self._dirty or self.path is None:
+            self._dirty = {}
+            return
+        if self._lines >= self.compact_after:
+            self.compact()
+            return
+        with open(self.path, 'a', encoding='utf-8') as journal:
+            journal.write(json.dumps(self._dirty, ensure_ascii=False) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        self._lines += 1
+        self._dirty = {}
+
+    def compact(self):
+        """Переписывает журнал одной строкой с полным состоянием."""
+        if self.path is None:
+            return
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as journal:
+            journal.write(json.dumps(self.data, ensure_ascii=False) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temporary, self.path)
+        self._lines = 1
+        self._dirty = {}
@@ -0,0 +1,198 @@
+import codecs
+import json
+import logging
+import os
+import time
+
+import exceptions
+from logging_setup import fields
+from homework import check_status, fetch_homework_statuses
+from schema import validate_homework
+
+CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 16 * 1024))
+BACKFILL_AGE = int(os.getenv('BACKFILL_AGE', 24 * 60 * 60))
+WHITESPACE = ' \t\n\r'
+
+
+class JSONReader:
+    """Буфер над потоком фрагментов текста для пошагового разбора JSON.
+
+    Разобранная часть буфера отбрасывается, поэтому в памяти держится
+    только текущее значение и непрочитанный остаток фрагмента.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.finished = False
+
+    def read_more(self):
+        """Дочитывает следующий фрагмент; False, если поток закончился."""
+        if self.finished:
+            return False
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+        for chunk in self.chunks:
+            if chunk:
+                self.buffer += chunk
+                return True
+        self.finished = True
+        return False
+
+    def peek(self):
+        """Следующий значащий символ без его чтения."""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                raise exceptions.NotJSONError(
+                    'Ответ API оборвался до конца JSON-объекта.'
+                )
+
+    def expect(self, *symbols):
+        """Читает один из ожидаемых разделителей и возвращает его."""
+        symbol = self.peek()
+        if symbol not in symbols:
+            raise exceptions.NotJSONError(
+                f'Не получен ожидаемый JSON-объект: {symbol!r} '
+                f'на позиции {self.position}.'
+            )
+        self.position += 1
+        return symbol
+
+    def value(self):
+        """Читает очередное JSON-значение целиком.
+
+        Значение, упирающееся в конец буфера, разбирается заново после
+        следующего фрагмента: число могло оборваться на границе.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except json.JSONDecodeError as error:
+                if not self.read_more():
+                    raise exceptions.NotJSONError(
+                        f'Не получен ожидаемый JSON-объект: {error}'
+                    )
+                continue
+            if end < len(self.buffer) or not self.read_more():
+                self.position = end
+                return value
+
+
+class HomeworkStream:
+    """Записи о работах из тела ответа API по мере его получения.
+
+    current_date становится известен после того, как поток прочитан
+    до конца; тогда же проверяются ключи верхнего уровня.
+    """
+
+    def __init__(self, chunks):
+        self.reader = JSONReader(chunks)
+        self.current_date = None
+        self.received = 0
+        self.rejected = 0
+
+    def __iter__(self):
+        reader = self.reader
+        has_homeworks = has_current_date = False
+        reader.expect('{')
+        if reader.peek() == '}':
+            reader.expect('}')
+        else:
+            while True:
+                key = reader.value()
+                reader.expect(':')
+                if key == 'homeworks':
+                    has_homeworks = True
+                    yield from self.homeworks()
+                elif key == 'current_date':
+                    has_current_date = True
+                    self.current_date = reader.value()
+                else:
+                    reader.value()
+                if reader.expect(',', '}') == '}':
+                    break
+        if not has_homeworks:
+            raise KeyError('Ошибка ключа homeworks.')
+        if not has_current_date:
+            raise exceptions.NoCurrentDateError(
+                'Ключ current_date отсутствует.'
+            )
+        if not isinstance(self.current_date, int):
+            raise exceptions.NotIntCurrentDateError(
+                'Тип ключа current_date отличен от int'
+            )
+
+    def homeworks(self):
+        """Проверенные записи массива homeworks; некорректные пропускаются."""
+        reader = self.reader
+        if reader.peek() != '[':
+            raise TypeError('Поступили данные типа, отличного от list.')
+        reader.expect('[')
+        if reader.peek() == ']':
+            reader.expect(']')
+            return
+        while True:
+            homework = reader.value()
+            try:
+                homework = validate_homework(homework)
+            except (KeyError, ValueError) as error:
+                self.rejected += 1
+                logging.error(
+                    f'Пропущена работа {homework!r}: {error}',
+                    extra=fields(homework=homework, error=error),
+                )
+            else:
+                self.received += 1
+                yield homework
+            if reader.expect(',', ']') == ']':
+                return
+
+
+def iter_text(parameters, chunk_size=CHUNK_SIZE):
+    """Тело ответа фрагментами текста; UTF-8 на границах не рвётся."""
+    decoder = codecs.getincrementaldecoder(parameters.encoding or 'utf-8')()
+    try:
+        for chunk in parameters.iter_content(chunk_size):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+    finally:
+        parameters.close()
+
+
+def stream_homeworks(headers, timestamp, session=None):
+    """Запрашивает API и возвращает HomeworkStream по телу ответа."""
+    parameters = fetch_homework_statuses(
+        headers, timestamp, session, stream=True
+    )
+    try:
+        check_status(parameters)
+    except Exception:
+        parameters.close()
+        raise
+    return HomeworkStream(iter_text(parameters))
+
+
+def needs_backfill(tenant, age=BACKFILL_AGE, now=None):
+    """Ответ стоит читать потоком: первый опрос и курсор старше age.
+
+    Курсор не сдвигается, пока новых работ нет, поэтому у давно
+    бездействующего подписчика он тоже старый; такие подписчики после
+    первого опроса опрашиваются обычным путём.
+    """
+    if tenant.polled:
+        return False
+    if now is None:
+        now = time.time()
+    return tenant.from_date < now - age
@@ -0,0 +1,135 @@
+import logging
+import os
+import string
+from functools import lru_cache
+
+from homework import HOMEWORK_VERDICTS
+
+DEFAULT_LANGUAGE = os.getenv('DEFAULT_LANGUAGE', 'ru')
+MESSAGE_STYLE = os.getenv('MESSAGE_STYLE', 'short')
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', 4096))
+FIELDS = ('homework_name', 'verdict', 'lesson_name', 'reviewer_comment')
+
+VERDICTS = {
+    'ru': HOMEWORK_VERDICTS,
+    'en': {
+        'approved': 'The reviewer accepted the work. Hooray!',
+        'reviewing': 'The work is being reviewed.',
+        'rejected': 'The reviewer has remarks on the work.',
+    },
+}
+MESSAGE_TEMPLATES = {
+    'ru': {
+        'short': 'Изменился статус проверки работы "{homework_name}". '
+                 '{verdict}',
+        'full': 'Изменился статус проверки работы "{homework_name}". '
+                '{verdict}\n'
+                'Урок: {lesson_name}\n'
+                'Комментарий ревьюера: {reviewer_comment}',
+    },
+    'en': {
+        'short': 'Review status of "{homework_name}" changed. {verdict}',
+        'full': 'Review status of "{homework_name}" changed. {verdict}\n'
+                'Lesson: {lesson_name}\n'
+                'Reviewer comment: {reviewer_comment}',
+    },
+}
+
+
+class CompiledTemplate:
+    """Шаблон, разобранный один раз на литералы и поля.
+
+    Строка шаблона, в которой хотя бы одно поле пусто, при отрисовке
+    пропускается: так необязательные reviewer_comment и lesson_name
+    не оставляют пустых подписей.
+    """
+
+    __slots__ = ('lines', 'fields')
+
+    def __init__(self, text):
+        self.lines = []
+        for line in text.split('\n'):
+            parts = []
+            for literal, field, _, _ in string.Formatter().parse(line):
+                if field is not None and field not in FIELDS:
+                    raise ValueError(f'Неизвестное поле шаблона: {field}')
+                parts.append((literal, field))
+            self.lines.append(tuple(parts))
+        self.fields = frozenset(
+            field for parts in self.lines for _, field in parts if field
+        )
+
+    def render(self, values):
+        """Подставляет значения полей."""
+        lines = []
+        for parts in self.lines:
+            if all(values.get(field) for _, field in parts if field):
+                lines.append(''.join(
+                    literal + (values[field] if field else '')
+                    for literal, field in parts
+                ))
+        return '\n'.join(lines)
+
+
+COMPILED = {
+    (language, style): CompiledTemplate(text)
+    for language, styles in MESSAGE_TEMPLATES.items()
+    for style, text in styles.items()
+}
+
+
+def template_key(language=None, style=None):
+    """Ключ шаблона; для неизвестного языка берётся язык по умолчанию."""
+    key = (language or DEFAULT_LANGUAGE, style or MESSAGE_STYLE)
+    if key not in COMPILED:
+        logging.warning(f'Нет шаблона {key}, используется язык по умолчанию')
+        key = (DEFAULT_LANGUAGE, key[1])
+    return key
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_message(key, status, homework_name, lesson_name, reviewer_comment):
+    """Сообщение о статусе работы; отрисованные сообщения кэшируются."""
+    language, _ = key
+    return COMPILED[key].render({
+        'homework_name': homework_name,
+        'verdict': VERDICTS[language][status],
+        'lesson_name': lesson_name,
+        'reviewer_comment': reviewer_comment,
+    })
+
+
+class Renderer:
+    """Отрисовка сообщений о работах на языке подписчика."""
+
+    __slots__ = ('key', 'extra_fields')
+
+    def __init__(self, language=None, style=None):
+        self.key = template_key(language, style)
+        fields = COMPILED[self.key].fields
+        self.extra_fields = (
+            'lesson_name' in fields, 'reviewer_comment' in fields
+        )
+
+    def render(self, homework):
+        """Сообщение о статусе работы schema.Homework.
+
+        Необязательные поля входят в ключ кэша, только если шаблон
+        их использует.
+        """
+        with_lesson, with_comment = self.extra_fields
+        return render_message(
+            self.key, homework.status, homework.homework_name,
+            homework.lesson_name if with_lesson else None,
+            homework.reviewer_comment if with_comment else None,
+        )
+
+    def describe(self, homework):
+        """Ключ, статус и сообщение для HomeworkTracker."""
+        return homework.key, homework.status, self.render(homework)
+
+
+@lru_cache(maxsize=None)
+def get_renderer(language=None, style=None):
+    """Общий для подписчиков с одним языком Renderer."""
+    return Renderer(language, style)
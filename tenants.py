@@ -0,0 +1,652 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from telebot import TeleBot
+
+import exceptions
+from circuit_breaker import CircuitBreaker
+from dedup import DEDUP_DB, DedupIndex
+from delivery import DeliveryQueue, is_outage
+from fanout import POLL_WORKERS, FanOut
+from homework import (
+    NO_CHANGES_MESSAGE, TELEGRAM_TOKEN, HomeworkTracker, make_headers,
+    request_homework_statuses, send_chat_message,
+)
+from http_session import get_session, pool_stats
+from logging_setup import fields, setup_logging
+from metrics import (
+    METRICS_PORT, POLL_LAG, POLL_SCHEDULE, QUEUE_DEPTH, start_http_server,
+)
+from rate_limit import RATE_LIMIT_DB, create_limiter
+from response_cache import ResponseCache
+from schema import validate_response
+from scheduling import (
+    SCHEDULE_BUCKETS, FixedScheduler, TimingWheel, anchored,
+    create_scheduler, due_tenants, stagger,
+)
+from sharding import Coordinator, Shard
+from snapshot import create_snapshot
+from shutdown import SHUTDOWN, SHUTDOWN_TIMEOUT
+from streaming import BACKFILL_AGE, needs_backfill, stream_homeworks
+from templates import DEFAULT_LANGUAGE, get_renderer
+from webhook import RECONCILE_PERIOD, WEBHOOK_PORT, start_receiver, wait_events
+
+TENANTS_DB = os.getenv('TENANTS_DB', 'tenants.sqlite3')
+MIGRATIONS = (
+    ('homework_statuses', "TEXT NOT NULL DEFAULT '{}'"),
+    ('language', f"TEXT NOT NULL DEFAULT '{DEFAULT_LANGUAGE}'"),
+)
+
+SUBSCRIPTIONS_VERSION = '''
+CREATE TABLE IF NOT EXISTS subscriptions_version (
+    version INTEGER NOT NULL
+);
+INSERT INTO subscriptions_version SELECT 0
+    WHERE NOT EXISTS (SELECT 1 FROM subscriptions_version);
+CREATE TRIGGER IF NOT EXISTS tenants_inserted AFTER INSERT ON tenants
+    BEGIN UPDATE subscriptions_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS tenants_deleted AFTER DELETE ON tenants
+    BEGIN UPDATE subscriptions_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS tenants_changed
+    AFTER UPDATE OF token, chat_id, language ON tenants
+    BEGIN UPDATE subscriptions_version SET version = version + 1; END;
+'''
+
+UNKNOWN = object()
+
+
+class Tenant:
+    """Подписка одного студента: токен Практикума и чат для уведомлений."""
+
+    __slots__ = (
+        'token', 'chat_id', 'from_date', 'last_status', 'language',
+        'tracker', '_homework_status', 'idle_polls', 'failures',
+        'next_poll', 'polled',
+    )
+
+    def __init__(
+        self, token, chat_id, from_date=0, last_status='', statuses=None,
+        language=DEFAULT_LANGUAGE,
+    ):
+        self.token = token
+        self.chat_id = chat_id
+        self.from_date = from_date
+        self.last_status = last_status
+        self.language = language
+        self.tracker = HomeworkTracker(
+            statuses, get_renderer(language).describe
+        )
+        self._homework_status = UNKNOWN
+        self.idle_polls = 0
+        self.failures = 0
+        self.next_poll = 0
+        self.polled = False
+
+    def __repr__(self):
+        return f'Tenant(chat_id={self.chat_id!r}, from_date={self.from_date})'
+
+    @property
+    def homework_status(self):
+        """Сводный статус работ; после перезапуска — из статусов трекера."""
+        if self._homework_status is UNKNOWN:
+            self._homework_status = (
+                'reviewing' if 'reviewing' in self.tracker.statuses.values()
+                else None
+            )
+        return self._homework_status
+
+    @homework_status.setter
+    def homework_status(self, status):
+        self._homework_status = status
+
+
+class TenantRegistry:
+    """Реестр подписок, хранящийся в SQLite.
+
+    Со snapshot курсоры и статусы подписчиков хранятся в бинарном
+    снимке с журналом изменений, а SQLite — источник списка подписок
+    и состояния новых подписчиков.
+    """
+
+    def __init__(self, path=TENANTS_DB, snapshot=None):
+        self.snapshot = snapshot
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS tenants ('
+            'token TEXT NOT NULL, '
+            'chat_id TEXT NOT NULL, '
+            'from_date INTEGER NOT NULL DEFAULT 0, '
+            "last_status TEXT NOT NULL DEFAULT '', "
+            "homework_statuses TEXT NOT NULL DEFAULT '{}', "
+            f"language TEXT NOT NULL DEFAULT '{DEFAULT_LANGUAGE}', "
+            'PRIMARY KEY (token, chat_id))'
+        )
+        columns = {
+            row[1] for row in
+            self.connection.execute('PRAGMA table_info(tenants)')
+        }
+        for column, definition in MIGRATIONS:
+            if column not in columns:
+                self.connection.execute(
+                    f'ALTER TABLE tenants ADD COLUMN {column} {definition}'
+                )
+        self.connection.executescript(SUBSCRIPTIONS_VERSION)
+        self.connection.commit()
+
+    def add(self, token, chat_id, from_date=None, language=DEFAULT_LANGUAGE):
+        """Добавляет подписку или обновляет курсор и язык существующей."""
+        if from_date is None:
+            from_date = int(time.time())
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO tenants (token, chat_id, from_date, language) '
+                'VALUES (?, ?, ?, ?) ON CONFLICT (token, chat_id) '
+                'DO UPDATE SET from_date = excluded.from_date, '
+                'language = excluded.language',
+                (token, str(chat_id), from_date, language),
+            )
+
+    def remove(self, token, chat_id):
+        """Удаляет подписку."""
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM tenants WHERE token = ? AND chat_id = ?',
+                (token, str(chat_id)),
+            )
+
+    def load(self):
+        """Загружает все подписки из реестра.
+
+        Со snapshot, если список подписок в SQLite не менялся с записи
+        снимка, подписчики целиком читаются из снимка. Иначе подписки
+        сверяются с SQLite, а новый снимок пишется в фоне.
+        """
+        if self.snapshot is None:
+            rows = self.connection.execute(
+                'SELECT token, chat_id, from_date, last_status, '
+                'homework_statuses, language FROM tenants'
+            )
+            return [
+                Tenant(*row[:4], statuses=json.loads(row[4]), language=row[5])
+                for row in rows
+            ]
+        version = self.subscriptions_version()
+        states = self.snapshot.load()
+        if self.snapshot.subscriptions != version:
+            self.reconcile(states)
+            self.snapshot.subscriptions = version
+            self.snapshot.checkpoint()
+        return [
+            Tenant(
+                token, chat_id, from_date, last_status, statuses=statuses,
+                language=language,
+            )
+            for (token, chat_id), (
+                from_date, last_status, statuses, language
+            ) in states.items()
+        ]
+
+    def subscriptions_version(self):
+        """Счётчик изменений списка подписок."""
+        return self.connection.execute(
+            'SELECT version FROM subscriptions_version'
+        ).fetchone()[0]
+
+    def reconcile(self, states):
+        """Приводит состояния снимка к списку подписок в SQLite.
+
+        Новые подписчики получают состояние из SQLite, а подписчики,
+        которых больше нет в реестре, забываются.
+        """
+        rows = self.connection.execute(
+            'SELECT token, chat_id, from_date, last_status, '
+            'homework_statuses, language FROM tenants'
+        )
+        keys = []
+        for token, chat_id, from_date, last_status, statuses, language in (
+            rows
+        ):
+            state = states.get((token, chat_id))
+            states[token, chat_id] = (
+                (from_date, last_status, json.loads(statuses), language)
+                if state is None else (*state[:3], language)
+            )
+            keys.append((token, chat_id))
+        self.snapshot.retain(keys)
+
+    def save(self, tenants):
+        """Сохраняет курсоры и последние статусы одной транзакцией."""
+        if self.snapshot is not None:
+            self.snapshot.append(tenants)
+            return
+        with self.connection:
+            self.connection.executemany(
+                'UPDATE tenants SET from_date = ?, last_status = ?, '
+                'homework_statuses = ? WHERE token = ? AND chat_id = ?',
+                [
+                    (tenant.from_date, tenant.last_status,
+                     json.dumps(tenant.tracker.statuses),
+                     tenant.token, tenant.chat_id)
+                    for tenant in tenants
+                ],
+            )
+
+    def close(self):
+        """Закрывает соединение с базой и записывает итоговый снимок."""
+        if self.snapshot is not None:
+            self.snapshot.close()
+        self.connection.close()
+
+
+def advance_cursor(tenant, homework, current_date):
+    """Сдвигает курсор подписчика и запоминает сводный статус работ.
+
+    Курсор не сдвигается, пока новых работ нет: тогда запросы подписчика
+    не меняются и ответ можно взять из кэша. При current_date=None
+    запоминается только сводный статус.
+    """
+    if homework is None:
+        return
+    if current_date is not None:
+        tenant.from_date = current_date
+    statuses = tenant.tracker.statuses.values()
+    tenant.homework_status = (
+        'reviewing' if 'reviewing' in statuses else homework.status
+    )
+
+
+def unsent(tenant, messages):
+    """Сообщения, отличающиеся от последнего отправленного подписчику."""
+    for message in messages:
+        if message != tenant.last_status:
+            tenant.last_status = message
+            yield message
+
+
+def handle_homeworks(tenant, homeworks, current_date):
+    """Возвращает сообщения о сменах статусов и сдвигает курсор."""
+    transitions = tenant.tracker.transitions(homeworks, current_date)
+    advance_cursor(
+        tenant, homeworks[0] if homeworks else None, current_date
+    )
+    return list(unsent(tenant, transitions or [NO_CHANGES_MESSAGE]))
+
+
+def stream_homeworks_messages(tenant, stream):
+    """Сообщения о сменах статусов по мере чтения потока работ.
+
+    Курсор сдвигается только после того, как поток прочитан целиком.
+    """
+    first = None
+    changed = False
+    for homework in stream:
+        first = first or homework
+        for message in unsent(tenant, tenant.tracker.transitions([homework])):
+            changed = True
+            yield message
+    advance_cursor(tenant, first, stream.current_date)
+    if not changed:
+        yield from unsent(tenant, [NO_CHANGES_MESSAGE])
+
+
+def handle_error(tenant, error):
+    """Логирует сбой и возвращает сообщение, если оно ещё не отправлялось.
+
+    Пока автомат разомкнут, у всех подписчиков одна и та же ошибка, поэтому
+    каждый получает одно уведомление на весь сбой.
+    """
+    if isinstance(error, (
+        exceptions.NoCurrentDateError, exceptions.NotIntCurrentDateError
+    )):
+        logging.error(
+            f'{tenant}: {error}', extra=fields(tenant.chat_id, error=error)
+        )
+        return []
+    message = f'Сбой в работе программы: {error}'
+    logging.log(
+        logging.DEBUG if isinstance(error, exceptions.CircuitOpenError)
+        else logging.ERROR,
+        f'{tenant}: {message}', extra=fields(tenant.chat_id, error=error),
+    )
+    if tenant.last_status != str(error):
+        tenant.last_status = str(error)
+        return [message]
+    return []
+
+
+class Poller:
+    """Общие для всех подписчиков ресурсы опроса API."""
+
+    def __init__(
+        self, session=None, cache=None, scheduler=None, backfill_age=None,
+        breaker=None, limiter=None,
+    ):
+        self.session = session
+        self.cache = cache
+        self.scheduler = scheduler or FixedScheduler()
+        self.backfill_age = backfill_age
+        self.breaker = breaker
+        self.guard = nullcontext if breaker is None else breaker.guard
+        self.limiter = limiter
+
+    def throttle(self, tenant):
+        """Ждёт токен общего бюджета запросов к API.
+
+        Подписчики с работой на ревью получают токены в первую очередь.
+        """
+        if self.limiter is not None:
+            self.limiter.acquire(
+                priority=tenant.homework_status == 'reviewing'
+            )
+
+    def fetch(self, tenant):
+        """Возвращает проверенный список работ подписчика и current_date.
+
+        Токен ограничителя берётся до вызова: ожидание не входит ни во
+        время запроса, ни в защиту автомата.
+        """
+        if self.cache is not None:
+            return self.cache.get_homeworks(
+                tenant.token, tenant.from_date, self.session
+            )
+        response = validate_response(request_homework_statuses(
+            make_headers(tenant.token), tenant.from_date, self.session
+        ))
+        return response.homeworks, response.current_date
+
+    def check(self, tenant):
+        """Опрашивает API и возвращает новые сообщения для подписчика.
+
+        Заодно назначает время следующего опроса подписчика.
+        """
+        self.throttle(tenant)
+        try:
+            with self.guard():
+                homeworks, current_date = self.fetch(tenant)
+        except Exception as error:
+            return self.settle(tenant, error=error)
+        return self.settle(tenant, homeworks, current_date)
+
+    def settle(self, tenant, homeworks=None, current_date=None, error=None):
+        """Разбирает итог запроса: сообщения и время следующего опроса."""
+        if error is None:
+            try:
+                messages = handle_homeworks(tenant, homeworks, current_date)
+                delay = self.scheduler.next_delay(tenant, homeworks)
+            except Exception as failure:
+                error = failure
+        if error is not None:
+            messages = handle_error(tenant, error)
+            delay = self.scheduler.next_delay(tenant, error=error)
+        self.reschedule(tenant, delay, error)
+        return messages
+
+    def reschedule(self, tenant, delay, error=None):
+        """Назначает следующий опрос подписчика через delay секунд.
+
+        После успешного опроса срок отсчитывается от запланированного,
+        чтобы задержки цикла не накапливались, а после ошибки, в том
+        числе с Retry-After, — от текущего момента.
+        """
+        now = time.monotonic()
+        tenant.polled = True
+        if error is not None:
+            tenant.next_poll = now + delay
+        else:
+            tenant.next_poll = anchored(tenant.next_poll, delay, now)
+
+    def stream(self, tenant):
+        """Опрашивает API и отдаёт сообщения, не дожидаясь конца ответа.
+
+        Для подписчиков с давним курсором: длинная история работ
+        разбирается потоком и не загружается в память целиком.
+        """
+        self.throttle(tenant)
+        try:
+            with self.guard():
+                stream = stream_homeworks(
+                    make_headers(tenant.token), tenant.from_date,
+                    self.session,
+                )
+                for message in stream_homeworks_messages(tenant, stream):
+                    yield message
+            delay = self.scheduler.next_delay(tenant, range(stream.received))
+            failure = None
+        except Exception as error:
+            yield from handle_error(tenant, error)
+            delay = self.scheduler.next_delay(tenant, error=error)
+            failure = error
+        self.reschedule(tenant, delay, failure)
+
+    def messages(self, tenant):
+        """Сообщения подписчику: потоком при давнем курсоре, иначе списком.
+
+        Потоковый разбор включается параметром backfill_age.
+        """
+        if self.streaming(tenant):
+            return self.stream(tenant)
+        return self.check(tenant)
+
+    def streaming(self, tenant):
+        """True, если ответ подписчику разбирается потоком."""
+        return self.backfill_age is not None and needs_backfill(
+            tenant, self.backfill_age
+        )
+
+
+def poll_tenant(bot, tenant, poller=None):
+    """Один цикл опроса API и уведомления для подписчика."""
+    for message in (poller or Poller()).messages(tenant):
+        send_chat_message(bot, tenant.chat_id, message)
+
+
+def poll_tenants(outbox, tenants, poller=None, fanout=None):
+    """Опрашивает подписчиков и ставит уведомления в очередь доставки.
+
+    С fanout запросы выполняются параллельно в пуле потоков, а потоково
+    разбираемые ответы по-прежнему читаются по одному. После сигнала
+    остановки оставшиеся подписчики не опрашиваются.
+    """
+    poller = poller or Poller()
+    if fanout is not None and not SHUTDOWN.requested:
+        parallel = [
+            tenant for tenant in tenants if not poller.streaming(tenant)
+        ]
+        results, _ = fanout.poll(parallel)
+        for result in results:
+            for message in poller.settle(
+                result.tenant, result.homeworks, result.current_date,
+                result.error,
+            ):
+                outbox.put(result.tenant.chat_id, message)
+        tenants = [tenant for tenant in tenants if poller.streaming(tenant)]
+    for tenant in tenants:
+        if SHUTDOWN.requested:
+            return
+        for message in poller.messages(tenant):
+            outbox.put(tenant.chat_id, message)
+
+
+def apply_events(events, tenants_by_token, outbox):
+    """Обрабатывает присланные вебхуком события как ответы API.
+
+    Курсор опроса события не сдвигают: сверка опросом должна увидеть
+    изменения, для которых события не пришли. Уже сообщённые события
+    трекер при сверке не повторит. Возвращает подписчиков, состояние
+    которых изменилось.
+    """
+    touched = []
+    for token, homeworks, _ in events:
+        for tenant in tenants_by_token.get(token, ()):
+            for message in handle_homeworks(tenant, homeworks, None):
+                outbox.put(tenant.chat_id, message)
+            touched.append(tenant)
+    return touched
+
+
+def index_by_token(tenants):
+    """Подписчики, сгруппированные по токену Практикума."""
+    index = {}
+    for tenant in tenants:
+        index.setdefault(tenant.token, []).append(tenant)
+    return index
+
+
+def poll_lag(tenants, now):
+    """Наибольшее опоздание опроса среди уже опрашивавшихся подписчиков."""
+    return max(
+        (now - tenant.next_poll for tenant in tenants if tenant.next_poll),
+        default=0,
+    )
+
+
+def run_cycle(registry, tenants, poller, outbox, fanout=None, wheel=None):
+    """Опрашивает подписчиков, которым пора, и сохраняет их состояние.
+
+    С wheel подписчики, которым пора, берутся из колеса таймеров, а не
+    перебором всех подписчиков, и после опроса ставятся на новый срок.
+    """
+    now = time.monotonic()
+    due = due_tenants(tenants, now) if wheel is None else wheel.expire(now)
+    POLL_LAG.set(poll_lag(due, now))
+    try:
+        poll_tenants(outbox, due, poller, fanout)
+    finally:
+        if wheel is not None:
+            for tenant in due:
+                wheel.schedule(tenant)
+            publish_schedule(wheel, time.monotonic())
+    registry.save(due)
+    cache = None if poller.cache is None else poller.cache.stats()
+    logging.debug(
+        f'Опрошено подписчиков: {len(due)}, пул соединений: {pool_stats()}, '
+        f'кэш ответов: {cache}, очередь отправки: {outbox.depth()}',
+        extra=fields(latency=time.monotonic() - now),
+    )
+
+
+def publish_schedule(wheel, now, buckets=SCHEDULE_BUCKETS):
+    """Публикует гистограмму предстоящих опросов в метрике.
+
+    Вызывается из цикла опроса: колесо меняется только в нём.
+    """
+    width = wheel.horizon / buckets
+    for window, count in enumerate(wheel.histogram(now, buckets)):
+        POLL_SCHEDULE.set(count, window=f'{window * width:g}')
+
+
+def drain(outbox, timeout=SHUTDOWN_TIMEOUT):
+    """Дожидается отправки очереди при остановке, но не дольше timeout."""
+    if not outbox.stop(timeout):
+        logging.warning(
+            f'За {timeout} с не доставлено сообщений: {outbox.depth()}'
+        )
+
+
+def main(sharded=False):
+    """Опрос всех подписчиков реестра в одном процессе.
+
+    Если задан WEBHOOK_PORT, статусы принимаются вебхуком, а опрос API
+    остаётся редкой сверкой раз в RECONCILE_PERIOD секунд. В режиме
+    sharded процесс ведёт только свою долю подписчиков, а доли
+    пересчитываются, когда воркеры появляются или уходят.
+    """
+    if TELEGRAM_TOKEN is None:
+        logging.critical('Отсутсвует переменная окружения TELEGRAM_TOKEN')
+        raise exceptions.TokensError('Ошибка небходимых переменных.')
+
+    bot = TeleBot(token=TELEGRAM_TOKEN)
+    registry = TenantRegistry(
+        snapshot=None if sharded else create_snapshot()
+    )
+    shard = Shard(registry, Coordinator(TENANTS_DB) if sharded else None)
+    inbox = queue.Queue() if WEBHOOK_PORT else None
+    poller = Poller(
+        session=get_session(), cache=ResponseCache(),
+        scheduler=(
+            create_scheduler() if inbox is None
+            else FixedScheduler(RECONCILE_PERIOD)
+        ),
+        backfill_age=BACKFILL_AGE,
+        breaker=CircuitBreaker('practicum'),
+        limiter=create_limiter(
+            RATE_LIMIT_DB or (TENANTS_DB if sharded else None)
+        ),
+    )
+    outbox = DeliveryQueue(
+        bot, breaker=CircuitBreaker('telegram', is_failure=is_outage),
+        dedup=DedupIndex(path=DEDUP_DB or (TENANTS_DB if sharded else None)),
+    ).start()
+    fanout = FanOut(poller) if POLL_WORKERS > 1 else None
+    wheel = TimingWheel(period=poller.scheduler.period)
+    QUEUE_DEPTH.set_function(outbox.depth)
+    if inbox is not None:
+        start_receiver(inbox)
+
+    tenants_by_token = {}
+    try:
+        while True:
+            try:
+                now = time.monotonic()
+                if shard.refresh(now):
+                    tenants_by_token = index_by_token(shard.tenants)
+                    stagger(shard.tenants, now, poller.scheduler.period)
+                    wheel.reset(shard.tenants)
+                run_cycle(
+                    registry, shard.tenants, poller, outbox, fanout, wheel
+                )
+            finally:
+                timeout = shard.timeout(wheel.next_wakeup(time.monotonic()))
+                events = []
+                with SHUTDOWN.interruptible():
+                    if inbox is None:
+                        time.sleep(timeout)
+                    else:
+                        events = wait_events(inbox, timeout)
+                registry.save(apply_events(events, tenants_by_token, outbox))
+    finally:
+        if fanout is not None:
+            fanout.close()
+        drain(outbox)
+        shard.close()
+        registry.close()
+
+
+def manage(argv):
+    """Добавление и удаление подписок из командной строки.
+
+    add принимает необязательный четвёртый аргумент — язык сообщений.
+    """
+    registry = TenantRegistry()
+    try:
+        command, token, chat_id, *options = argv
+        if command == 'add':
+            language = options[0] if options else DEFAULT_LANGUAGE
+            registry.add(token, chat_id, language=language)
+        elif command == 'remove':
+            registry.remove(token, chat_id)
+        else:
+            raise ValueError(f'Неизвестная команда: {command}')
+    finally:
+        registry.close()
+
+
+if __name__ == '__main__':
+    setup_logging(f'{Path(__file__).stem}.log', level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] != 'shard':
+        manage(sys.argv[1:])
+    else:
+        if METRICS_PORT:
+            start_http_server()
+        SHUTDOWN.install()
+        try:
+            main(sharded=sys.argv[1:] == ['shard'])
+        except exceptions.ShutdownRequested:
+            logging.info('Бот остановлен.')
@@ -116,6 +116,20 @@ class MockTelegramBot:
         self.text = text
 
 
+class FakeClock:
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
 class BreakInfiniteLoop(Exception):
     pass
 
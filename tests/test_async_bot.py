@@ -0,0 +1,150 @@
+import asyncio
+
+import requests
+
+import tests.check_utils as check_utils
+
+
+class TestAsyncBot:
+
+    def test_pipeline_cycle_delivers_messages(
+            self, monkeypatch, random_timestamp, data_with_new_hw_status
+    ):
+        import async_bot
+        import homework
+        import scheduling
+        import tenants
+
+        def mock_get(*args, **kwargs):
+            return check_utils.MockResponseGET(
+                random_timestamp=random_timestamp,
+                data=data_with_new_hw_status,
+            )
+
+        sent = []
+
+        class Bot(check_utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                sent.append((chat_id, text))
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        subscribers = [tenants.Tenant(f'token-{i}', str(i)) for i in range(5)]
+        pipeline = async_bot.AsyncPipeline(
+            Bot(), subscribers, poll_concurrency=2, send_concurrency=2,
+            poller=tenants.Poller(scheduler=scheduling.FixedScheduler(0)),
+        )
+        asyncio.run(pipeline.run(cycles=2))
+
+        assert sorted(
+            chat_id for chat_id, text in sent
+            if text != homework.NO_CHANGES_MESSAGE
+        ) == [
+            str(i) for i in range(5)
+        ], (
+            'Убедитесь, что каждому подписчику отправлено одно сообщение '
+            'о смене статуса.'
+        )
+        assert all(
+            t.from_date == data_with_new_hw_status['current_date']
+            for t in subscribers
+        )
+
+    def test_stop_lets_inflight_polls_deliver(self):
+        import threading
+
+        import async_bot
+        import tenants
+
+        started = threading.Event()
+        release = threading.Event()
+        sent = []
+
+        class Poller:
+            def check(self, tenant):
+                started.set()
+                release.wait(1)
+                return ['Статус изменился']
+
+        class Bot(check_utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                sent.append((chat_id, text))
+
+        subscriber = tenants.Tenant('token-1', '7')
+        pipeline = async_bot.AsyncPipeline(
+            Bot(), [subscriber], poller=Poller()
+        )
+
+        async def scenario():
+            run = asyncio.create_task(pipeline.run())
+            await asyncio.to_thread(started.wait, 1)
+            pipeline.stop()
+            release.set()
+            await asyncio.wait_for(run, 1)
+
+        asyncio.run(scenario())
+        assert sent == [('7', 'Статус изменился')], (
+            'Убедитесь, что по сигналу начатый опрос доводится до конца, '
+            'а его сообщение доставляется.'
+        )
+
+    def test_slow_delivery_does_not_hold_polling(self):
+        import threading
+
+        import async_bot
+        import tenants
+
+        cycles = []
+        release = threading.Event()
+        sent = []
+
+        class Poller:
+            def check(self, tenant):
+                tenant.next_poll = 0
+                return [f'Сообщение {len(cycles)}']
+
+        class Bot(check_utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                release.wait(1)
+                sent.append((chat_id, text, len(cycles)))
+
+        def on_cycle(due):
+            cycles.append(due)
+            if len(cycles) == 3:
+                release.set()
+
+        pipeline = async_bot.AsyncPipeline(
+            Bot(), [tenants.Tenant('token-1', '7')], poller=Poller(),
+            send_concurrency=1,
+        )
+        asyncio.run(pipeline.run(cycles=3, on_cycle=on_cycle))
+
+        assert len(sent) == 3
+        assert sent[0][2] == 3, (
+            'Убедитесь, что цикл опроса не ждёт доставки сообщений '
+            'предыдущего цикла.'
+        )
+
+    def test_failed_send_keeps_delivery_running(self):
+        import async_bot
+        import tenants
+
+        sent = []
+
+        class Poller:
+            def check(self, tenant):
+                return ['первое', 'второе', 'третье']
+
+        class Bot(check_utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if text == 'первое':
+                    raise RuntimeError('502 Bad Gateway')
+                sent.append(text)
+
+        pipeline = async_bot.AsyncPipeline(
+            Bot(), [tenants.Tenant('token-1', '7')], poller=Poller(),
+            send_concurrency=1,
+        )
+        asyncio.run(pipeline.run(cycles=1))
+        assert sent == ['второе', 'третье'], (
+            'Убедитесь, что сбой одной отправки не останавливает доставку.'
+        )
@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+import exceptions
+import tests.check_utils as check_utils
+
+
+class TestCircuitBreaker:
+
+    def test_opens_probes_and_closes(self):
+        import circuit_breaker
+
+        clock = check_utils.FakeClock()
+        breaker = circuit_breaker.CircuitBreaker(
+            'test', failure_threshold=2, reset_timeout=10, clock=clock
+        )
+        for _ in range(2):
+            with pytest.raises(exceptions.RequestError):
+                with breaker.guard():
+                    raise exceptions.RequestError('timeout')
+        assert breaker.state == circuit_breaker.OPEN
+        with pytest.raises(exceptions.CircuitOpenError) as error:
+            with breaker.guard():
+                pass
+        assert error.value.retry_after == 10
+        clock.now = 10
+        with breaker.guard():
+            assert breaker.state == circuit_breaker.HALF_OPEN
+            with pytest.raises(exceptions.CircuitOpenError):
+                with breaker.guard():
+                    pass
+        assert breaker.state == circuit_breaker.CLOSED, (
+            'Убедитесь, что успешный пробный запрос замыкает автомат.'
+        )
+
+    def test_tenant_errors_do_not_open(self):
+        import circuit_breaker
+
+        breaker = circuit_breaker.CircuitBreaker('test', failure_threshold=1)
+        for error in (
+            exceptions.WrongStatusError('unauthorized', 401), KeyError('x')
+        ):
+            with pytest.raises(type(error)):
+                with breaker.guard():
+                    raise error
+        assert breaker.state == circuit_breaker.CLOSED, (
+            'Убедитесь, что ошибки отдельного подписчика не размыкают автомат.'
+        )
+
+    def test_outage_costs_few_requests_and_one_message(
+            self, monkeypatch, random_timestamp
+    ):
+        import circuit_breaker
+        import tenants
+
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            return check_utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=500
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        poller = tenants.Poller(breaker=circuit_breaker.CircuitBreaker(
+            'practicum', failure_threshold=3, reset_timeout=60
+        ))
+        subscribers = [tenants.Tenant(f'token-{i}', str(i)) for i in range(10)]
+        messages = [poller.check(tenant) for tenant in subscribers]
+        messages += [poller.check(tenant) for tenant in subscribers]
+        assert len(calls) == 3, (
+            'Убедитесь, что после размыкания автомата запросы не выполняются.'
+        )
+        assert sum(map(len, messages)) == len(subscribers) + 3, (
+            'Убедитесь, что повторные сообщения о разомкнутом автомате '
+            'не отправляются.'
+        )
@@ -0,0 +1,84 @@
+import tests.check_utils as check_utils
+
+
+class TestDedup:
+
+    def test_suppresses_repeats_until_ttl(self):
+        import dedup
+
+        clock = check_utils.FakeClock()
+        index = dedup.DedupIndex(ttl=60, clock=clock)
+        assert index.claim('1', 'Сбой A')
+        assert index.claim('1', 'Сбой B')
+        assert not index.claim('1', 'Сбой A'), (
+            'Убедитесь, что чередующиеся ошибки не отправляются повторно.'
+        )
+        assert index.claim('2', 'Сбой A'), (
+            'Убедитесь, что ключ индекса учитывает чат.'
+        )
+        clock.now = 60
+        assert index.claim('1', 'Сбой A'), (
+            'Убедитесь, что записи индекса вытесняются по TTL.'
+        )
+        assert len(index.entries) == 1
+        index.release('1', 'Сбой A')
+        assert index.claim('1', 'Сбой A')
+
+    def test_workers_share_index_through_sqlite(self, tmp_path):
+        import dedup
+
+        clock = check_utils.FakeClock()
+        path = tmp_path / 'dedup.sqlite3'
+        first = dedup.DedupIndex(ttl=60, path=path, clock=clock)
+        second = dedup.DedupIndex(ttl=60, path=path, clock=clock)
+        assert first.claim('1', 'hw approved')
+        assert not second.claim('1', 'hw approved'), (
+            'Убедитесь, что воркеры на одной базе не дублируют сообщения.'
+        )
+        clock.now = 61
+        assert second.claim('1', 'hw approved')
+        first.close()
+        second.close()
+
+    def test_main_does_not_repeat_alternating_errors(self, homework_module):
+        import dedup
+
+        class Bot:
+            sent = []
+
+            def send_message(self, chat_id=None, text=None):
+                self.sent.append(text)
+
+        bot = Bot()
+        index = dedup.DedupIndex()
+        last_status = ''
+        for error in ('A', 'B', 'A', 'B'):
+            homework_module.send_once(bot, error, index)
+            last_status = homework_module.notify(
+                bot, [f'Сбой: {error}'], last_status, index
+            )
+        assert bot.sent == ['A', 'Сбой: A', 'B', 'Сбой: B']
+
+    def test_repeated_transition_is_not_suppressed(self):
+        import dedup
+        import tenants
+        from schema import validate_response
+
+        index = dedup.DedupIndex()
+        subscriber = tenants.Tenant('token-1', '7')
+        sent = []
+        for date, status in enumerate(('reviewing', 'rejected', 'reviewing')):
+            response = {'homeworks': [{
+                'id': 1, 'homework_name': 'hw.zip', 'status': status,
+                'date_updated': f'2024-01-01T00:0{date}:00Z',
+            }], 'current_date': date}
+            homeworks = validate_response(response).homeworks
+            sent += [
+                message for message in tenants.handle_homeworks(
+                    subscriber, homeworks, response['current_date']
+                ) if index.claim(subscriber.chat_id, message)
+            ]
+        assert len(sent) == 3 and sent[0] == sent[2], (
+            'Убедитесь, что повторный переход в тот же статус '
+            'не отсекается как повтор уведомления.'
+        )
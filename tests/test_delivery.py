@@ -0,0 +1,169 @@
+import threading
+
+import requests
+from telebot.apihelper import ApiHTTPException, ApiTelegramException
+
+
+class RecordingBot:
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        with self.lock:
+            if self.failures:
+                raise self.failures.pop(0)
+            self.sent.append((chat_id, text))
+
+
+def too_many_requests(retry_after):
+    return ApiTelegramException('send_message', None, {
+        'ok': False,
+        'error_code': 429,
+        'description': 'Too Many Requests',
+        'parameters': {'retry_after': retry_after},
+    })
+
+
+def bad_gateway():
+    response = requests.Response()
+    response.status_code = 502
+    response.reason = 'Bad Gateway'
+    response._content = b'<html>502 Bad Gateway</html>'
+    return ApiHTTPException('send_message', response)
+
+
+class TestDelivery:
+
+    def test_coalesces_messages_per_chat(self):
+        import delivery
+
+        bot = RecordingBot()
+        outbox = delivery.DeliveryQueue(bot, workers=2, chat_interval=0)
+        outbox.put('1', 'first')
+        outbox.put('1', 'second')
+        outbox.put('2', 'other')
+        outbox.start()
+        assert outbox.stop(timeout=1), 'Очередь не опустела.'
+        assert sorted(bot.sent) == [
+            ('1', 'first\n\nsecond'), ('2', 'other')
+        ], (
+            'Убедитесь, что несколько сообщений одному чату объединяются.'
+        )
+        assert outbox.coalesced == 1
+
+    def test_retries_after_rate_limit(self):
+        import delivery
+
+        bot = RecordingBot(failures=[too_many_requests(0.05)])
+        outbox = delivery.DeliveryQueue(bot, workers=1).start()
+        outbox.put('1', 'hello')
+        assert outbox.stop(timeout=1)
+        assert bot.sent == [('1', 'hello')], (
+            'Убедитесь, что после ответа 429 сообщение отправляется повторно.'
+        )
+
+    def test_drops_after_max_attempts(self):
+        import delivery
+
+        bot = RecordingBot(failures=[requests.ConnectionError()] * 3)
+        outbox = delivery.DeliveryQueue(
+            bot, workers=1, max_attempts=3, retry_period=0
+        )
+        outbox.start().put('1', 'hello')
+        assert outbox.stop(timeout=1)
+        assert bot.sent == [] and outbox.dropped == 1
+
+    def test_retries_after_http_error_page(self):
+        import delivery
+
+        bot = RecordingBot(failures=[bad_gateway()])
+        outbox = delivery.DeliveryQueue(bot, workers=1, retry_period=0)
+        outbox.start().put('1', 'hello')
+        assert outbox.stop(timeout=1), (
+            'Убедитесь, что ответ 502 без JSON не останавливает отправителя.'
+        )
+        assert bot.sent == [('1', 'hello')]
+
+    def test_http_error_page_is_outage(self):
+        import circuit_breaker
+        import delivery
+
+        breaker = circuit_breaker.CircuitBreaker(
+            'telegram', failure_threshold=1, is_failure=delivery.is_outage
+        )
+        bot = RecordingBot(failures=[bad_gateway()])
+        outbox = delivery.DeliveryQueue(bot, workers=1, breaker=breaker)
+        outbox.start().put('1', 'hello')
+        outbox.stop(timeout=0.2)
+        assert breaker.state == circuit_breaker.OPEN, (
+            'Убедитесь, что страница ошибки 5xx размыкает автомат Telegram.'
+        )
+
+    def test_unexpected_error_keeps_worker_alive(self):
+        import delivery
+
+        bot = RecordingBot(failures=[RuntimeError('boom')])
+        outbox = delivery.DeliveryQueue(bot, workers=1, chat_interval=0)
+        outbox.start().put('1', 'lost')
+        outbox.put('2', 'hello')
+        assert outbox.stop(timeout=1), 'Очередь не опустела.'
+        assert bot.sent == [('2', 'hello')] and outbox.dropped == 1, (
+            'Убедитесь, что непредвиденная ошибка не завершает поток '
+            'отправителя.'
+        )
+
+    def test_rate_limit_does_not_spend_attempts(self):
+        import delivery
+
+        bot = RecordingBot(failures=[too_many_requests(0)] * 5)
+        outbox = delivery.DeliveryQueue(bot, workers=1, max_attempts=3)
+        outbox.start().put('1', 'hello')
+        assert outbox.stop(timeout=1)
+        assert bot.sent == [('1', 'hello')] and outbox.dropped == 0, (
+            'Убедитесь, что ответы 429 не расходуют попытки отправки.'
+        )
+
+    def test_coalesce_respects_length_limit(self):
+        import delivery
+
+        text, rest = delivery.coalesce(['a' * 3, 'b' * 3, 'c' * 3], limit=8)
+        assert text == 'aaa\n\nbbb' and rest == ['ccc']
+
+    def test_skips_messages_already_sent(self):
+        import dedup
+        import delivery
+
+        bot = RecordingBot()
+        outbox = delivery.DeliveryQueue(
+            bot, workers=1, chat_interval=0, dedup=dedup.DedupIndex()
+        ).start()
+        outbox.put('1', 'status')
+        assert outbox.stop(timeout=1), 'Очередь не опустела.'
+        outbox.put('1', 'status')
+        assert outbox.depth() == 0, (
+            'Убедитесь, что уже отправленное сообщение не ставится в очередь.'
+        )
+        assert bot.sent == [('1', 'status')]
+
+    def test_dropped_merged_send_releases_each_message(self):
+        import dedup
+        import delivery
+
+        index = dedup.DedupIndex()
+        bot = RecordingBot(failures=[requests.ConnectionError()] * 2)
+        outbox = delivery.DeliveryQueue(
+            bot, workers=1, chat_interval=0, max_attempts=2,
+            retry_period=0, dedup=index,
+        )
+        outbox.put('1', 'first')
+        outbox.put('1', 'second')
+        outbox.start()
+        assert outbox.stop(timeout=1)
+        assert outbox.dropped == 1
+        assert index.claim('1', 'first') and index.claim('1', 'second'), (
+            'Убедитесь, что после отказа в отправке объединённого сообщения '
+            'каждое исходное сообщение снова можно отправить.'
+        )
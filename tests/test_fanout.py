@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import nullcontext
+
+
+class SlowPoller:
+
+    def __init__(self, delays, throttle=0):
+        self.delays = delays
+        self.guard = nullcontext
+        self.release = threading.Event()
+        self.throttle_delay = throttle
+
+    def throttle(self, tenant):
+        time.sleep(self.throttle_delay)
+
+    def fetch(self, tenant):
+        delay = self.delays[tenant.token]
+        if delay is None:
+            self.release.wait(5)
+            return [], 0
+        time.sleep(delay)
+        if tenant.token == 'broken':
+            raise KeyError('homeworks')
+        return [], int(delay * 1000)
+
+
+class TestFanOut:
+
+    def test_polls_concurrently_and_collects_errors(self):
+        import fanout
+        import tenants
+
+        poller = SlowPoller({'a': 0.1, 'b': 0.1, 'c': 0.1, 'broken': 0.1})
+        pool = fanout.FanOut(poller, workers=4, deadline=5)
+        batch = [tenants.Tenant(token, token) for token in poller.delays]
+        try:
+            results, report = pool.poll(batch)
+        finally:
+            pool.close()
+        by_token = {result.tenant.token: result for result in results}
+        assert set(by_token) == set(poller.delays)
+        assert by_token['a'].current_date == 100
+        assert isinstance(by_token['broken'].error, KeyError), (
+            'Убедитесь, что исключение запроса сохраняется для подписчика.'
+        )
+        assert (report.polled, report.failed) == (4, 1)
+        assert report.concurrency > 2, (
+            'Убедитесь, что запросы подписчиков выполняются параллельно.'
+        )
+
+    def test_abandons_requests_past_deadline(self):
+        import exceptions
+        import fanout
+        import tenants
+
+        poller = SlowPoller({'fast': 0, 'hung': None})
+        pool = fanout.FanOut(poller, workers=2, deadline=0.2)
+        batch = [tenants.Tenant(token, token) for token in poller.delays]
+        started = time.monotonic()
+        try:
+            results, report = pool.poll(batch)
+        finally:
+            poller.release.set()
+            pool.close()
+        assert time.monotonic() - started < 2, (
+            'Убедитесь, что цикл не ждёт зависший запрос дольше deadline.'
+        )
+        errors = {result.tenant.token: result.error for result in results}
+        assert errors['fast'] is None
+        assert isinstance(errors['hung'], exceptions.DeadlineError)
+        assert report.expired == 1
+
+    def test_throttle_wait_is_outside_deadline(self):
+        import fanout
+        import tenants
+
+        poller = SlowPoller({'a': 0, 'b': 0}, throttle=0.3)
+        pool = fanout.FanOut(poller, workers=2, deadline=0.2)
+        batch = [tenants.Tenant(token, token) for token in poller.delays]
+        try:
+            results, report = pool.poll(batch)
+        finally:
+            pool.close()
+        assert [result.error for result in results] == [None, None], (
+            'Убедитесь, что ожидание токена ограничителя не считается '
+            'временем запроса.'
+        )
+        assert report.busy < 0.2
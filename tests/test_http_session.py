@@ -0,0 +1,32 @@
+class TestHttpSession:
+
+    def test_shared_session_is_pooled(self):
+        import http_session
+
+        http_session.close_session()
+        session = http_session.get_session()
+        assert session is http_session.get_session(), (
+            'Убедитесь, что все опросчики используют одну сессию.'
+        )
+        adapter = session.get_adapter('https://practicum.yandex.ru')
+        assert adapter._pool_maxsize == http_session.POOL_MAXSIZE
+        assert http_session.pool_stats(session) == {}
+        http_session.close_session()
+
+    def test_request_passes_timeout(self, monkeypatch, homework_module):
+        import requests
+
+        captured = {}
+
+        def mock_get(*args, **kwargs):
+            captured.update(kwargs)
+            raise requests.ConnectionError('offline')
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        try:
+            homework_module.get_api_answer(0)
+        except Exception:
+            pass
+        assert captured['timeout'] == homework_module.REQUEST_TIMEOUT, (
+            'Убедитесь, что запрос к API выполняется с таймаутом.'
+        )
@@ -0,0 +1,70 @@
+import json
+import logging
+
+import tests.check_utils as check_utils
+
+
+class TestLoggingSetup:
+
+    def test_writes_json_records_through_queue(self, tmp_path):
+        import logging_setup
+
+        path = tmp_path / 'homework.log'
+        logger = logging.getLogger('test_logging_setup')
+        logger.propagate = False
+        listener = logging_setup.setup_logging(
+            path, stream=None, logger=logger, log_format='json'
+        )
+        try:
+            logger.info(
+                'Статус %s', 'approved',
+                extra=logging_setup.fields('42', {'id': 7}, latency=0.5),
+            )
+            try:
+                raise KeyError('homeworks')
+            except KeyError:
+                logger.exception('Сбой')
+        finally:
+            logging_setup.stop_listener(listener)
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+            for handler in listener.handlers:
+                handler.close()
+        first, second = [
+            json.loads(line)
+            for line in path.read_text(encoding='utf-8').splitlines()
+        ]
+        assert first['message'] == 'Статус approved'
+        assert (first['tenant'], first['homework_id'], first['latency']) == (
+            '42', 7, 0.5
+        ), 'Убедитесь, что поля extra попадают в JSON-запись.'
+        assert second['exc_class'] == 'KeyError', (
+            'Убедитесь, что класс исключения сохраняется в записи.'
+        )
+        assert 'Traceback' in second['exception']
+
+    def test_samples_repetitive_debug_lines(self):
+        import logging_setup
+
+        clock = check_utils.FakeClock()
+        sampling = logging_setup.SamplingFilter(
+            interval=10, burst=2, clock=clock
+        )
+
+        def record(level=logging.DEBUG, line=1):
+            return logging.LogRecord(
+                'test', level, 'bot.py', line, 'message', None, None
+            )
+
+        passed = [sampling.filter(record()) for _ in range(5)]
+        assert passed == [True, True, False, False, False], (
+            'Убедитесь, что повторяющиеся DEBUG-записи прореживаются.'
+        )
+        assert sampling.filter(record(line=2))
+        assert sampling.filter(record(level=logging.ERROR))
+        clock.now = 10
+        resumed = record()
+        assert sampling.filter(resumed)
+        assert resumed.suppressed == 3, (
+            'Убедитесь, что число отброшенных записей попадает в лог.'
+        )
@@ -0,0 +1,109 @@
+import pytest
+
+
+class TestMetrics:
+
+    def test_timed_records_latency_and_errors(self, monkeypatch):
+        import metrics
+
+        registry = metrics.Registry()
+        latency = registry.histogram('latency', 'test', buckets=(1, 10))
+        errors = registry.counter('errors', 'test')
+        monkeypatch.setattr(metrics, 'CALL_LATENCY', latency)
+        monkeypatch.setattr(metrics, 'ERRORS', errors)
+
+        @metrics.timed('sample')
+        def sample(fail):
+            """Тестовая функция."""
+            if fail:
+                raise KeyError('boom')
+            return 'ok'
+
+        assert sample(False) == 'ok'
+        with pytest.raises(KeyError):
+            sample(True)
+
+        snapshot = registry.snapshot()
+        assert snapshot['latency']['{function="sample"}']['count'] == 2
+        assert snapshot['errors'] == {
+            '{exception="KeyError",function="sample"}': 1
+        }, 'Убедитесь, что исключения считаются по классам.'
+        exposition = registry.exposition()
+        assert 'latency_bucket{function="sample",le="+Inf"} 2' in exposition
+        assert '# TYPE errors counter' in exposition
+
+    def test_gauge_function_and_endpoint(self):
+        import urllib.request
+
+        import metrics
+
+        depth = metrics.Registry().gauge('depth', 'test')
+        depth.set_function(lambda: 3)
+        assert depth.snapshot() == {'': 3}
+
+        server = metrics.start_http_server(port=0)
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/metrics'
+            with urllib.request.urlopen(url, timeout=1) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+        assert '# TYPE homework_call_seconds histogram' in body
+
+    def test_homework_functions_are_instrumented(self, homework_module):
+        import metrics
+
+        before = metrics.CALL_LATENCY.snapshot().get(
+            '{function="parse_status"}', {'count': 0}
+        )['count']
+        homework_module.parse_status(
+            {'homework_name': 'hw', 'status': 'approved'}
+        )
+        after = metrics.CALL_LATENCY.snapshot()['{function="parse_status"}']
+        assert after['count'] == before + 1
+
+    def test_tenant_polls_are_instrumented(
+            self, monkeypatch, random_timestamp
+    ):
+        from http import HTTPStatus
+
+        import requests
+
+        import metrics
+        import tenants
+        import tests.check_utils as check_utils
+
+        def count(function):
+            return metrics.CALL_LATENCY.snapshot().get(
+                f'{{function="{function}"}}', {'count': 0}
+            )['count']
+
+        def errors():
+            return metrics.ERRORS.snapshot().get(
+                '{exception="WrongStatusError",function="decode_response"}', 0
+            )
+
+        fetched, validated, failed = (
+            count('fetch_homework_statuses'), count('validate_response'),
+            errors(),
+        )
+        statuses = [HTTPStatus.OK, HTTPStatus.INTERNAL_SERVER_ERROR]
+
+        def mock_get(*args, **kwargs):
+            return check_utils.MockResponseGET(
+                random_timestamp=random_timestamp,
+                http_status=statuses.pop(0),
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        poller = tenants.Poller()
+        tenant = tenants.Tenant('token', '1')
+        poller.check(tenant)
+        poller.check(tenant)
+        assert count('fetch_homework_statuses') == fetched + 2, (
+            'Убедитесь, что запросы подписчиков попадают в метрики.'
+        )
+        assert count('validate_response') == validated + 1
+        assert errors() == failed + 1, (
+            'Убедитесь, что ошибки опроса подписчиков считаются по классам.'
+        )
@@ -0,0 +1,79 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+import telebot
+
+import exceptions
+import tests.check_utils as check_utils
+
+
+class CheckedBot(check_utils.MockTelegramBot):
+    calls = []
+
+    def get_me(self):
+        CheckedBot.calls.append('get_me')
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        CheckedBot.calls.append(text)
+
+
+class TestOnce:
+
+    def test_import_skips_heavy_dependencies(self):
+        code = (
+            'import sys, homework; '
+            'print(sorted({"telebot", "requests", "dotenv"} & '
+            'set(sys.modules)))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            check=True, cwd=Path(__file__).resolve().parent.parent,
+        )
+        assert result.stdout.strip() == '[]', (
+            'Убедитесь, что telebot, requests и dotenv импортируются '
+            'только при необходимости.'
+        )
+
+    def test_run_once_keeps_state_between_runs(
+            self, monkeypatch, tmp_path, homework_module, random_timestamp
+    ):
+        from state_store import StateStore
+
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(telebot, 'TeleBot', CheckedBot)
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: (
+            check_utils.MockResponseGET(random_timestamp=random_timestamp)
+        ))
+        CheckedBot.calls = []
+        path = tmp_path / 'state'
+        for _ in range(2):
+            homework_module.run_once(StateStore(path))
+        assert CheckedBot.calls == [
+            'get_me', homework_module.NO_CHANGES_MESSAGE
+        ], (
+            'Убедитесь, что токен проверяется один раз, а повторный запуск '
+            'не дублирует уведомление.'
+        )
+        assert StateStore(path).get('current_date') == random_timestamp
+
+    def test_run_once_requires_state_path(
+            self, monkeypatch, homework_module
+    ):
+        from state_store import StateStore
+
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(telebot, 'TeleBot', CheckedBot)
+        CheckedBot.calls = []
+        with pytest.raises(exceptions.TokensError):
+            homework_module.run_once(StateStore(None))
+        assert CheckedBot.calls == [], (
+            'Убедитесь, что без STATE_PATH разовый запуск ничего не '
+            'отправляет.'
+        )
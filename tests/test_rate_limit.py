@@ -0,0 +1,59 @@
+import tests.check_utils as check_utils
+
+
+class TestRateLimit:
+
+    def test_bucket_limits_rate_after_burst(self):
+        import rate_limit
+
+        clock = check_utils.FakeClock()
+        bucket = rate_limit.TokenBucket(
+            10, burst=3, reserve=0, path=None, clock=clock,
+            sleep=clock.sleep,
+        )
+        waits = [bucket.acquire() for _ in range(5)]
+        assert waits[:3] == [0, 0, 0]
+        assert [round(wait, 3) for wait in waits[3:]] == [0.1, 0.1], (
+            'Убедитесь, что после исчерпания ведра запросы идут со '
+            'скоростью rate.'
+        )
+
+    def test_reserve_is_left_for_priority_requests(self):
+        import rate_limit
+
+        clock = check_utils.FakeClock()
+        bucket = rate_limit.TokenBucket(
+            1, burst=3, reserve=2, path=None, clock=clock,
+            sleep=clock.sleep,
+        )
+        assert bucket.acquire() == 0
+        assert bucket.acquire(priority=True) == 0
+        assert bucket.acquire(priority=True) == 0
+        assert clock.now == 0, (
+            'Убедитесь, что приоритетные запросы получают резерв ведра.'
+        )
+        assert bucket.acquire() == 3, (
+            'Убедитесь, что обычный запрос ждёт, пока восстановится резерв.'
+        )
+
+    def test_budget_is_shared_through_sqlite(self, tmp_path):
+        import rate_limit
+
+        clock = check_utils.FakeClock()
+        path = tmp_path / 'limits.sqlite3'
+        first, second = [
+            rate_limit.TokenBucket(
+                10, burst=2, reserve=0, path=path, clock=clock,
+                sleep=clock.sleep,
+            )
+            for _ in range(2)
+        ]
+        try:
+            assert first.acquire() == 0
+            assert second.acquire() == 0
+            assert round(first.acquire(), 3) == 0.1, (
+                'Убедитесь, что процессы на одной базе делят общий бюджет.'
+            )
+        finally:
+            first.close()
+            second.close()
@@ -0,0 +1,76 @@
+import json
+
+import requests
+
+
+class RawResponse:
+
+    def __init__(self, status_code, data, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(data).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class TestReplay:
+
+    def test_records_and_replays_responses(self, monkeypatch, tmp_path):
+        import homework
+        import replay
+
+        path = tmp_path / 'responses.jsonl'
+        answers = [
+            RawResponse(200, {'homeworks': [
+                {'homework_name': 'hw.zip', 'status': 'reviewing'},
+            ], 'current_date': 100}),
+            RawResponse(429, {}, {'Retry-After': '30'}),
+            RawResponse(200, {'homeworks': [
+                {'homework_name': 'hw.zip', 'status': 'approved'},
+            ], 'current_date': 200}),
+        ]
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: answers.pop(0)
+        )
+        monkeypatch.setattr(homework, 'RECORD_PATH', str(path))
+        try:
+            for timestamp in (0, 100, 100):
+                homework.fetch_homework_statuses(
+                    homework.make_headers('secret'), timestamp
+                )
+        finally:
+            replay._recorders.pop(str(path)).close()
+
+        assert 'secret' not in path.read_text(encoding='utf-8'), (
+            'Убедитесь, что токен не попадает в запись ответов.'
+        )
+        responses = list(replay.read_recording(path))
+        assert [r.from_date for r in responses] == [0, 100, 100]
+        bot = replay.NullBot()
+        stats = replay.replay(responses, bot)
+        assert len(bot.messages) == 3 and 'Ура' in bot.messages[2], (
+            'Убедитесь, что воспроизведение проходит весь конвейер бота.'
+        )
+        assert stats.calls['get_api_answer'] == 3
+        assert stats.calls['send_message'] == 3
+        assert stats.errors[('get_api_answer', 'RetryAfterError')] == 1, (
+            'Убедитесь, что Retry-After сохраняется в записи.'
+        )
+
+    def test_replay_tracks_each_tenant_like_the_bot(self):
+        import replay
+
+        body = json.dumps({'homeworks': [
+            {'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'},
+        ], 'current_date': 100})
+        responses = [
+            replay.RecordedResponse(at, tenant, 0, 200, {}, body)
+            for at, tenant in ((1, 'a'), (2, 'a'), (3, 'b'))
+        ]
+        bot = replay.NullBot()
+        replay.replay(responses, bot)
+        assert sum('Ура' in message for message in bot.messages) == 2, (
+            'Убедитесь, что повтор того же ответа подписчику не даёт '
+            'нового уведомления, как и в боте.'
+        )
@@ -0,0 +1,70 @@
+import json
+
+import requests
+
+
+class MockRawResponse:
+
+    def __init__(self, data, status_code=200, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode()
+        self.headers = headers or {}
+        self.decoded = 0
+
+    def json(self):
+        self.decoded += 1
+        return json.loads(self.content)
+
+
+class TestResponseCache:
+
+    def test_unchanged_body_skips_decoding(self, monkeypatch):
+        import response_cache
+
+        responses = [
+            MockRawResponse({'homeworks': [], 'current_date': 10}),
+            MockRawResponse({'homeworks': [], 'current_date': 20}),
+            MockRawResponse({
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 30,
+            }),
+        ]
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: responses.pop(0)
+        )
+        cache = response_cache.ResponseCache()
+
+        assert cache.get_homeworks('token', 1) == ([], 10)
+        second = responses[0]
+        assert cache.get_homeworks('token', 1) == ([], 20), (
+            'Убедитесь, что при попадании в кэш возвращается свежий '
+            '`current_date`.'
+        )
+        assert second.decoded == 0, (
+            'Убедитесь, что неизменный ответ не разбирается повторно.'
+        )
+        homeworks, current_date = cache.get_homeworks('token', 1)
+        assert homeworks and current_date == 30
+        assert cache.stats() == {'hits': 1, 'misses': 2, 'entries': 1}
+
+    def test_not_modified_uses_validators(self, monkeypatch):
+        import response_cache
+
+        sent_headers = []
+        responses = [
+            MockRawResponse(
+                {'homeworks': [], 'current_date': 10},
+                headers={'ETag': '"v1"'},
+            ),
+            MockRawResponse({}, status_code=304),
+        ]
+
+        def mock_get(*args, **kwargs):
+            sent_headers.append(kwargs['headers'])
+            return responses.pop(0)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        cache = response_cache.ResponseCache()
+        cache.get_homeworks('token', 1)
+        assert cache.get_homeworks('token', 1) == ([], 10)
+        assert sent_headers[1]['If-None-Match'] == '"v1"'
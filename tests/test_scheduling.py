@@ -0,0 +1,129 @@
+import exceptions
+
+
+class TestScheduling:
+
+    def make_tenant(self):
+        import tenants
+        return tenants.Tenant('token', '1')
+
+    def make_scheduler(self):
+        import scheduling
+        return scheduling.AdaptiveScheduler(
+            period=600, reviewing=60, max_idle=4800, error_period=30,
+            max_error=240, rng=lambda: 0.5,
+        )
+
+    def test_idle_backoff_and_reviewing(self):
+        scheduler = self.make_scheduler()
+        tenant = self.make_tenant()
+        delays = [scheduler.next_delay(tenant, []) for _ in range(5)]
+        assert delays == [600, 1200, 2400, 4800, 4800], (
+            'Убедитесь, что при пустых ответах интервал растёт '
+            'экспоненциально до max_idle.'
+        )
+        tenant.homework_status = 'reviewing'
+        assert scheduler.next_delay(tenant, [{'status': 'reviewing'}]) == 60
+        assert scheduler.next_delay(tenant, []) == 60, (
+            'Убедитесь, что пока работа на ревью, интервал остаётся коротким.'
+        )
+
+    def test_error_backoff_and_retry_after(self):
+        scheduler = self.make_scheduler()
+        tenant = self.make_tenant()
+        error = exceptions.RequestError('offline')
+        delays = [
+            scheduler.next_delay(tenant, error=error) for _ in range(5)
+        ]
+        assert delays == [30, 60, 120, 240, 240]
+        throttled = exceptions.RetryAfterError('429', 900)
+        assert scheduler.next_delay(tenant, error=throttled) == 900, (
+            'Убедитесь, что заголовок Retry-After соблюдается.'
+        )
+        scheduler.next_delay(tenant, [])
+        assert tenant.failures == 0
+
+    def test_jitter_bounds(self):
+        import scheduling
+        low = scheduling.AdaptiveScheduler(period=600, rng=lambda: 0.0)
+        high = scheduling.AdaptiveScheduler(period=600, rng=lambda: 1.0)
+        assert low.next_delay(self.make_tenant(), []) == 540
+        assert high.next_delay(self.make_tenant(), []) == 660
+
+    def test_stagger_spreads_tenants_over_period(self):
+        import scheduling
+        import tenants
+
+        batch = [tenants.Tenant(f'token-{i}', str(i)) for i in range(1000)]
+        scheduling.stagger(batch, now=0, period=600)
+        wheel = scheduling.TimingWheel(tick=1, period=600)
+        for tenant in batch:
+            wheel.schedule(tenant)
+        histogram = wheel.histogram(0, buckets=10)
+        assert sum(histogram) == 1000
+        assert max(histogram) < 150, (
+            'Убедитесь, что первые опросы разнесены по периоду, '
+            'а не приходятся на один момент.'
+        )
+        phases = [tenant.next_poll for tenant in batch]
+        scheduling.stagger(batch, now=0, period=600)
+        assert phases == [tenant.next_poll for tenant in batch]
+
+    def test_wheel_expires_due_tenants_in_order(self):
+        import scheduling
+        import tenants
+
+        wheel = scheduling.TimingWheel(tick=1, slots=8)
+        batch = [tenants.Tenant(str(i), str(i)) for i in range(4)]
+        for tenant, deadline in zip(batch, (2.5, 3.0, 11.0, 40.0)):
+            tenant.next_poll = deadline
+            wheel.schedule(tenant)
+        assert wheel.next_wakeup(0) == 2.5
+        assert wheel.expire(2) == []
+        assert wheel.expire(3) == batch[:2]
+        assert wheel.next_wakeup(3) == 8, (
+            'Убедитесь, что срок следующего оборота колеса не путается '
+            'со сроками текущего.'
+        )
+        assert wheel.expire(12) == [batch[2]]
+        batch[0].next_poll = 5
+        wheel.schedule(batch[0])
+        assert wheel.expire(13) == [batch[0]], (
+            'Убедитесь, что просроченный срок не теряется.'
+        )
+        assert wheel.expire(100) == [batch[3]]
+        assert len(wheel) == 0
+
+    def test_anchored_deadline_does_not_drift(self):
+        import scheduling
+
+        planned = 100
+        for _ in range(50):
+            planned = scheduling.anchored(planned, 600, planned + 7)
+        assert planned == 100 + 50 * 600, (
+            'Убедитесь, что задержки цикла не накапливаются в сроках опроса.'
+        )
+        assert scheduling.anchored(100, 600, 2000) == 2500, (
+            'Убедитесь, что после простоя подписчик сохраняет смещение '
+            'в периоде.'
+        )
+        assert scheduling.anchored(0, 600, 50) == 650
+
+    def test_schedule_histogram_is_published_as_values(self):
+        import metrics
+        import scheduling
+        import tenants
+
+        wheel = scheduling.TimingWheel(tick=1, period=100)
+        for index, deadline in enumerate((5, 15, 16)):
+            tenant = tenants.Tenant(str(index), str(index))
+            tenant.next_poll = deadline
+            wheel.schedule(tenant)
+        tenants.publish_schedule(wheel, now=0, buckets=10)
+        snapshot = metrics.POLL_SCHEDULE.snapshot()
+        assert snapshot['{window="0"}'] == 1
+        assert snapshot['{window="10"}'] == 2
+        assert not metrics.POLL_SCHEDULE.functions, (
+            'Убедитесь, что гистограмма не считается в потоке HTTP-сервера '
+            'метрик.'
+        )
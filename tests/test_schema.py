@@ -0,0 +1,56 @@
+import pytest
+
+import exceptions
+
+
+class TestSchema:
+
+    def test_matches_check_response_and_parse_status(
+            self, homework_module, data_with_new_hw_status
+    ):
+        import schema
+        from templates import get_renderer
+
+        response = schema.validate_response(data_with_new_hw_status)
+        assert response.current_date == (
+            data_with_new_hw_status['current_date']
+        )
+        renderer = get_renderer()
+        assert [renderer.render(hw) for hw in response.homeworks] == [
+            homework_module.parse_status(hw)
+            for hw in homework_module.check_response(data_with_new_hw_status)
+        ], (
+            'Убедитесь, что validate_response() формирует те же сообщения, '
+            'что и parse_status().'
+        )
+        assert response.homeworks[0].key == '777777777'
+
+    @pytest.mark.parametrize('response, error', [
+        ([], TypeError),
+        ({'current_date': 1}, KeyError),
+        ({'homeworks': {}, 'current_date': 1}, TypeError),
+        ({'homeworks': []}, exceptions.NoCurrentDateError),
+        (
+            {'homeworks': [], 'current_date': '1'},
+            exceptions.NotIntCurrentDateError,
+        ),
+    ])
+    def test_raises_same_errors_as_check_response(self, response, error):
+        import schema
+
+        with pytest.raises(error):
+            schema.validate_response(response)
+
+    def test_invalid_homeworks_are_skipped(self):
+        import schema
+
+        response = schema.validate_response({
+            'homeworks': [
+                {'homework_name': 'hw1', 'status': 'unknown'},
+                {'status': 'approved'},
+                {'homework_name': 'hw2', 'status': 'approved'},
+            ],
+            'current_date': 1,
+        })
+        assert [hw.homework_name for hw in response.homeworks] == ['hw2']
+        assert response.rejected == 2
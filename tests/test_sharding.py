@@ -0,0 +1,105 @@
+import tests.check_utils as check_utils
+
+
+class TestSharding:
+
+    def test_ring_moves_few_keys_when_worker_joins(self):
+        import sharding
+
+        keys = [f'token-{index}' for index in range(1000)]
+        before = sharding.HashRing(['a', 'b', 'c'])
+        after = sharding.HashRing(['a', 'b', 'c', 'd'])
+        moved = [
+            key for key in keys if before.node_for(key) != after.node_for(key)
+        ]
+        assert all(after.node_for(key) == 'd' for key in moved), (
+            'Убедитесь, что ключи переезжают только к новому воркеру.'
+        )
+        assert 100 < len(moved) < 400, (
+            'Убедитесь, что новому воркеру достаётся около четверти ключей.'
+        )
+
+    def test_workers_split_tenants_and_rebalance(self, tmp_path):
+        import sharding
+        import tenants
+
+        path = tmp_path / 'tenants.sqlite3'
+        registry = tenants.TenantRegistry(path)
+        for index in range(20):
+            registry.add(f'token-{index}', index, from_date=index)
+        clock = check_utils.FakeClock(1000.0)
+        first = sharding.Shard(
+            registry, sharding.Coordinator(path, 'first', 30, clock), 0
+        )
+        second = sharding.Shard(
+            registry, sharding.Coordinator(path, 'second', 30, clock), 0
+        )
+        first.refresh(0)
+        second.refresh(0)
+        first.refresh(0)
+        tokens = [
+            {tenant.token for tenant in shard.tenants}
+            for shard in (first, second)
+        ]
+        assert not tokens[0] & tokens[1], (
+            'Убедитесь, что подписчик достаётся только одному воркеру.'
+        )
+        assert len(tokens[0] | tokens[1]) == 20
+
+        first.tenants[0].from_date = 999
+        moved_token = first.tenants[0].token
+        first.close()
+        assert second.refresh(0), (
+            'Убедитесь, что уход воркера вызывает перераспределение.'
+        )
+        assert len(second.tenants) == 20
+        moved = [t for t in second.tenants if t.token == moved_token]
+        assert moved[0].from_date == 999, (
+            'Убедитесь, что уходящий воркер сохраняет курсоры подписчиков.'
+        )
+        registry.close()
+
+    def test_refresh_keeps_new_owner_cursor(self, tmp_path):
+        import sharding
+        import tenants
+
+        path = tmp_path / 'tenants.sqlite3'
+        registry = tenants.TenantRegistry(path)
+        for index in range(20):
+            registry.add(f'token-{index}', index, from_date=1)
+        clock = check_utils.FakeClock(1000.0)
+        first = sharding.Shard(
+            registry, sharding.Coordinator(path, 'first', 30, clock), 0
+        )
+        second = sharding.Shard(
+            registry, sharding.Coordinator(path, 'second', 30, clock), 0
+        )
+        first.refresh(0)
+        second.refresh(0)
+        moved = second.tenants[0]
+        moved.from_date = 500
+        registry.save([moved])
+        first.refresh(0)
+        assert all(t.token != moved.token for t in first.tenants)
+        saved = [t for t in registry.load() if t.token == moved.token]
+        assert saved[0].from_date == 500, (
+            'Убедитесь, что прежний владелец не затирает курсор, '
+            'сдвинутый новым владельцем.'
+        )
+        registry.close()
+
+    def test_expired_lease_is_dropped(self, tmp_path):
+        import sharding
+
+        path = tmp_path / 'tenants.sqlite3'
+        clock = check_utils.FakeClock(1000.0)
+        stale = sharding.Coordinator(path, 'stale', 30, clock)
+        alive = sharding.Coordinator(path, 'alive', 30, clock)
+        stale.heartbeat()
+        alive.heartbeat()
+        assert alive.workers == ('alive', 'stale')
+        clock.now += 31
+        assert alive.heartbeat()
+        assert alive.workers == ('alive',), (
+            'Убедитесь, что воркер без продления аренды считается ушедшим.'
+        )
@@ -0,0 +1,43 @@
+import signal
+
+import pytest
+
+
+class TestShutdown:
+
+    def test_signal_interrupts_only_waiting(self):
+        import exceptions
+        import shutdown
+
+        graceful = shutdown.GracefulShutdown()
+        with pytest.raises(exceptions.ShutdownRequested):
+            with graceful.interruptible():
+                graceful.handle(signal.SIGTERM, None)
+
+        graceful = shutdown.GracefulShutdown()
+        graceful.handle(signal.SIGTERM, None)
+        assert graceful.requested, (
+            'Убедитесь, что сигнал вне ожидания только выставляет флаг.'
+        )
+        with pytest.raises(exceptions.ShutdownRequested):
+            with graceful.interruptible():
+                pass
+        assert not graceful.waiting
+
+    def test_drain_delivers_queued_messages(self):
+        import tenants
+
+        class Outbox:
+
+            def __init__(self):
+                self.stopped_with = None
+
+            def stop(self, timeout):
+                self.stopped_with = timeout
+                return True
+
+        outbox = Outbox()
+        tenants.drain(outbox, timeout=3)
+        assert outbox.stopped_with == 3, (
+            'Убедитесь, что очередь отправки дренируется с таймаутом.'
+        )
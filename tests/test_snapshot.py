@@ -0,0 +1,118 @@
+import pytest
+
+import exceptions
+
+
+class TestSnapshot:
+
+    def test_encode_roundtrip_and_version_check(self):
+        import snapshot
+
+        states = {
+            ('token-1', '1'): (
+                100, 'Ура', {'7': 'approved', '8': 'rejected'}, 'ru'
+            ),
+            ('token-2', '2'): (0, '', {}, 'en'),
+        }
+        data = snapshot.encode_snapshot(states.items(), subscriptions=3)
+        subscriptions, decoded = snapshot.decode_snapshot(data)
+        assert subscriptions == 3
+        assert {
+            key: (*state[:2], snapshot.materialize(state[2]), state[3])
+            for key, state in decoded.items()
+        } == states, (
+            'Убедитесь, что снимок восстанавливает состояние подписчиков.'
+        )
+        with pytest.raises(exceptions.SnapshotError):
+            snapshot.decode_snapshot(data[:4] + b'\x02' + data[5:])
+        with pytest.raises(exceptions.SnapshotError):
+            snapshot.decode_snapshot(data[:-1])
+
+    def test_registry_state_survives_restart(self, tmp_path):
+        import snapshot
+        import tenants
+
+        database = tmp_path / 'tenants.sqlite3'
+        path = str(tmp_path / 'tenants.snapshot')
+        registry = tenants.TenantRegistry(
+            database, snapshot.TenantSnapshot(path, checkpoint_bytes=200)
+        )
+        for index in range(3):
+            registry.add(f'token-{index}', index, from_date=0)
+        loaded = registry.load()
+        for cursor in range(1, 6):
+            for tenant in loaded:
+                tenant.from_date = cursor
+                tenant.tracker.statuses['1'] = f'status-{cursor}'
+            registry.save(loaded)
+        registry.snapshot._writer.join()
+
+        reopened = snapshot.TenantSnapshot(path)
+        assert {
+            key: state[0] for key, state in reopened.load().items()
+        } == {('token-0', '0'): 5, ('token-1', '1'): 5, ('token-2', '2'): 5}, (
+            'Убедитесь, что записи журнала не теряются при фоновом '
+            'сохранении снимка.'
+        )
+        reopened.close()
+        registry.remove('token-2', 2)
+        registry.close()
+
+        with open(f'{path}.wal', 'ab') as wal:
+            wal.write(b'\x10\x00')
+        registry = tenants.TenantRegistry(
+            database, snapshot.TenantSnapshot(path)
+        )
+        restored = registry.load()
+        assert [
+            (t.chat_id, t.from_date, t.tracker.statuses) for t in restored
+        ] == [('0', 5, {'1': 'status-5'}), ('1', 5, {'1': 'status-5'})], (
+            'Убедитесь, что состояние читается из снимка и журнала, '
+            'а повреждённый хвост журнала отбрасывается.'
+        )
+        registry.close()
+
+    def test_unchanged_subscriptions_load_without_scanning_sqlite(
+            self, tmp_path
+    ):
+        import snapshot
+        import tenants
+
+        database = tmp_path / 'tenants.sqlite3'
+        path = str(tmp_path / 'tenants.snapshot')
+        registry = tenants.TenantRegistry(
+            database, snapshot.TenantSnapshot(path)
+        )
+        registry.add('token-1', 1, from_date=0, language='en')
+        loaded = registry.load()
+        loaded[0].from_date = 7
+        registry.save(loaded)
+        registry.close()
+
+        registry = tenants.TenantRegistry(
+            database, snapshot.TenantSnapshot(path)
+        )
+        queries = []
+        registry.connection.set_trace_callback(queries.append)
+        restored = registry.load()
+        assert [(t.chat_id, t.from_date, t.language) for t in restored] == [
+            ('1', 7, 'en')
+        ]
+        assert not any('FROM tenants' in query for query in queries), (
+            'Убедитесь, что при неизменном списке подписок подписчики '
+            'читаются из снимка без чтения таблицы tenants.'
+        )
+        registry.close()
+
+        manager = tenants.TenantRegistry(database)
+        manager.add('token-2', 2, from_date=3)
+        manager.close()
+        registry = tenants.TenantRegistry(
+            database, snapshot.TenantSnapshot(path)
+        )
+        assert sorted(
+            (t.chat_id, t.from_date) for t in registry.load()
+        ) == [('1', 7), ('2', 3)], (
+            'Убедитесь, что новая подписка из SQLite попадает в реестр.'
+        )
+        registry.close()
@@ -0,0 +1,41 @@
+class TestStateStore:
+
+    def test_restart_restores_state(self, tmp_path):
+        import state_store
+
+        path = str(tmp_path / 'homework.state')
+        store = state_store.StateStore(path)
+        store.update(current_date=100, last_status='approved')
+        store.flush()
+        store.update(current_date=200)
+        store.flush()
+
+        restarted = state_store.StateStore(path)
+        assert restarted.get('current_date') == 200, (
+            'Убедитесь, что курсор восстанавливается после перезапуска.'
+        )
+        assert restarted.get('last_status') == 'approved'
+
+    def test_compaction_and_torn_write(self, tmp_path):
+        import state_store
+
+        path = tmp_path / 'homework.state'
+        store = state_store.StateStore(str(path), compact_after=3)
+        for current_date in range(5):
+            store.update(current_date=current_date)
+            store.flush()
+        assert len(path.read_text().splitlines()) <= 3, (
+            'Убедитесь, что журнал сжимается.'
+        )
+        with open(path, 'a') as journal:
+            journal.write('{"current_date": 9')
+        restarted = state_store.StateStore(str(path))
+        assert restarted.get('current_date') == 4
+
+    def test_without_path_keeps_state_in_memory(self):
+        import state_store
+
+        store = state_store.StateStore(None)
+        store.update(last_status='x')
+        store.flush()
+        assert store.get('last_status') == 'x'
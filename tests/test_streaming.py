@@ -0,0 +1,125 @@
+import json
+
+import pytest
+import requests
+
+import exceptions
+import tests.check_utils as check_utils
+
+
+def split(text, size):
+    return [text[index:index + size] for index in range(0, len(text), size)]
+
+
+class MockStreamResponse:
+
+    def __init__(self, data, chunk_size=5):
+        self.status_code = 200
+        self.headers = {}
+        self.encoding = None
+        self.body = json.dumps(data, ensure_ascii=False).encode()
+        self.chunk_size = chunk_size
+        self.sent = 0
+
+    def iter_content(self, chunk_size):
+        for chunk in split(self.body, self.chunk_size):
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        pass
+
+
+class TestStreaming:
+
+    def test_yields_same_homeworks_as_validate_response(
+            self, data_with_new_hw_status
+    ):
+        import schema
+        import streaming
+
+        data = dict(data_with_new_hw_status, extra={'nested': [1, 2]})
+        data['homeworks'] = data['homeworks'] * 3
+        text = json.dumps(data, ensure_ascii=False, indent=1)
+        stream = streaming.HomeworkStream(split(text, 3))
+        assert list(stream) == schema.validate_response(data).homeworks, (
+            'Убедитесь, что потоковый разбор возвращает те же записи, '
+            'что и validate_response().'
+        )
+        assert stream.current_date == data['current_date']
+
+    def test_first_homework_before_whole_body(self, data_with_new_hw_status):
+        import streaming
+
+        data = dict(data_with_new_hw_status)
+        data['homeworks'] = data['homeworks'] * 50
+        response = MockStreamResponse(data)
+        homeworks = iter(streaming.HomeworkStream(
+            streaming.iter_text(response)
+        ))
+        next(homeworks)
+        assert response.sent < len(response.body) / 10, (
+            'Убедитесь, что записи отдаются до получения всего ответа.'
+        )
+
+    @pytest.mark.parametrize('text, error', [
+        ('{"homeworks": [{"homework_name": "hw", "sta', (
+            exceptions.NotJSONError
+        )),
+        ('{"homeworks": []}', exceptions.NoCurrentDateError),
+        ('{"homeworks": {}, "current_date": 1}', TypeError),
+        ('{"current_date": 1}', KeyError),
+        ('{"homeworks": [], "current_date": 1', exceptions.NotJSONError),
+    ])
+    def test_raises_same_errors_as_validate_response(self, text, error):
+        import streaming
+
+        with pytest.raises(error):
+            list(streaming.HomeworkStream(split(text, 4)))
+
+    def test_poller_streams_old_cursor(
+            self, monkeypatch, data_with_new_hw_status
+    ):
+        import tenants
+
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            return MockStreamResponse(data_with_new_hw_status)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        poller = tenants.Poller(backfill_age=60)
+        tenant = tenants.Tenant('token', '1')
+        messages = list(poller.messages(tenant))
+        assert calls[0]['stream'] is True
+        assert len(messages) == 1
+        assert tenant.from_date == data_with_new_hw_status['current_date']
+        assert tenant.next_poll > 0
+
+    def test_idle_tenant_streams_only_on_first_poll(
+            self, monkeypatch, random_timestamp
+    ):
+        import tenants
+
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs.get('stream', False))
+            if kwargs.get('stream'):
+                return MockStreamResponse(
+                    {'homeworks': [], 'current_date': random_timestamp}
+                )
+            return check_utils.MockResponseGET(
+                random_timestamp=random_timestamp
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        poller = tenants.Poller(backfill_age=60)
+        tenant = tenants.Tenant('token', '1', from_date=0)
+        for _ in range(3):
+            list(poller.messages(tenant))
+        assert calls == [True, False, False], (
+            'Убедитесь, что бездействующий подписчик со старым курсором '
+            'читается потоком только при первом опросе.'
+        )
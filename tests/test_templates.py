@@ -0,0 +1,66 @@
+import pytest
+
+
+class TestTemplates:
+
+    def test_default_template_matches_parse_status(
+            self, homework_module, data_with_new_hw_status
+    ):
+        import schema
+        import templates
+
+        renderer = templates.Renderer('ru', 'short')
+        for status in homework_module.HOMEWORK_VERDICTS:
+            payload = dict(data_with_new_hw_status['homeworks'][0])
+            payload['status'] = status
+            assert renderer.render(schema.validate_homework(payload)) == (
+                homework_module.parse_status(payload)
+            ), 'Убедитесь, что шаблон по умолчанию совпадает с parse_status().'
+
+    def test_optional_fields_and_language(self):
+        import schema
+        import templates
+
+        full = templates.Renderer('en', 'full')
+        homework = schema.Homework(1, 'hw.zip', 'rejected', 'Fix tests', None)
+        assert full.render(homework) == (
+            'Review status of "hw.zip" changed. '
+            'The reviewer has remarks on the work.\n'
+            'Reviewer comment: Fix tests'
+        ), 'Убедитесь, что строки с пустыми полями пропускаются.'
+        assert templates.Renderer('xx').key[0] == templates.DEFAULT_LANGUAGE
+
+    def test_rendered_messages_are_cached(self):
+        import schema
+        import templates
+
+        templates.render_message.cache_clear()
+        renderer = templates.Renderer('ru', 'short')
+        for comment in ('a', 'b', 'c'):
+            renderer.render(schema.Homework(1, 'hw.zip', 'approved', comment))
+        info = templates.render_message.cache_info()
+        assert (info.hits, info.misses) == (2, 1), (
+            'Убедитесь, что поля, которых нет в шаблоне, не входят '
+            'в ключ кэша.'
+        )
+
+    def test_unknown_field_is_rejected(self):
+        import templates
+
+        with pytest.raises(ValueError):
+            templates.CompiledTemplate('{token}')
+
+    def test_tenant_language_is_stored(self, tmp_path):
+        import schema
+        import tenants
+
+        registry = tenants.TenantRegistry(tmp_path / 'tenants.sqlite3')
+        registry.add('token', 1, from_date=0, language='en')
+        tenant, = registry.load()
+        assert tenant.language == 'en'
+        messages = tenant.tracker.transitions([
+            schema.Homework(1, 'hw.zip', 'reviewing')
+        ])
+        assert messages == ['Review status of "hw.zip" changed. '
+                            'The work is being reviewed.']
+        registry.close()
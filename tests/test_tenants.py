@@ -0,0 +1,94 @@
+import requests
+
+import tests.check_utils as check_utils
+
+
+class TestTenants:
+
+    def test_registry_roundtrip(self, tmp_path):
+        import tenants
+
+        registry = tenants.TenantRegistry(tmp_path / 'tenants.sqlite3')
+        registry.add('token-1', 1, from_date=100)
+        registry.add('token-2', 2, from_date=200)
+        loaded = registry.load()
+        assert len(loaded) == 2, (
+            'Убедитесь, что реестр возвращает все добавленные подписки.'
+        )
+        for tenant in loaded:
+            tenant.from_date += 1
+            tenant.last_status = 'status'
+        registry.save(loaded)
+        registry.remove('token-2', 2)
+        reloaded = registry.load()
+        assert [(t.chat_id, t.from_date, t.last_status) for t in reloaded] == [
+            ('1', 101, 'status')
+        ], 'Убедитесь, что курсор и статус подписки сохраняются.'
+        registry.close()
+
+    def test_poll_tenant_uses_own_token_and_cursor(
+            self, monkeypatch, random_timestamp, data_with_new_hw_status
+    ):
+        import tenants
+
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            return check_utils.MockResponseGET(
+                random_timestamp=random_timestamp,
+                data=data_with_new_hw_status,
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = check_utils.MockTelegramBot()
+        tenant = tenants.Tenant('token-1', '42', from_date=5)
+        tenants.poll_tenant(bot, tenant)
+
+        assert calls[0]['headers']['Authorization'] == 'OAuth token-1'
+        assert calls[0]['params']['from_date'] == 5
+        assert bot.chat_id == '42'
+        assert tenant.from_date == data_with_new_hw_status['current_date']
+        assert tenant.last_status == bot.text
+
+    def test_every_homework_transition_is_reported(self, random_timestamp):
+        import schema
+        import tenants
+
+        tenant = tenants.Tenant('token', '1')
+        homeworks = [
+            schema.Homework(1, 'hw1', 'reviewing'),
+            schema.Homework(2, 'hw2', 'approved'),
+        ]
+        messages = tenants.handle_homeworks(
+            tenant, homeworks, random_timestamp
+        )
+        assert len(messages) == 2, (
+            'Убедитесь, что обрабатываются все работы из ответа, '
+            'а не только первая.'
+        )
+        assert tenant.homework_status == 'reviewing'
+        homeworks[0].status = 'approved'
+        messages = tenants.handle_homeworks(
+            tenant, homeworks, random_timestamp
+        )
+        assert len(messages) == 1 and '"hw1"' in messages[0], (
+            'Убедитесь, что сообщение отправляется только о работе, '
+            'статус которой изменился.'
+        )
+
+    def test_restored_reviewing_status_keeps_priority(self):
+        import scheduling
+        import tenants
+
+        restored = tenants.Tenant(
+            'token-1', '1', statuses={'1': 'approved', '2': 'reviewing'}
+        )
+        assert restored.homework_status == 'reviewing', (
+            'Убедитесь, что после перезапуска сводный статус берётся '
+            'из сохранённых статусов работ.'
+        )
+        scheduler = scheduling.AdaptiveScheduler(reviewing=120, jitter=0)
+        assert scheduler.next_delay(restored, []) == 120
+        idle = tenants.Tenant('token-2', '2', statuses={'1': 'approved'})
+        assert idle.homework_status is None
@@ -0,0 +1,95 @@
+import json
+import queue
+import urllib.error
+import urllib.request
+
+
+def post(server, payload, headers):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{server.server_port}/homework_statuses/',
+        data=json.dumps(payload).encode(), headers=headers, method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+class RecordingOutbox:
+
+    def __init__(self):
+        self.messages = []
+
+    def put(self, chat_id, message):
+        self.messages.append((chat_id, message))
+
+
+class TestWebhook:
+
+    def test_pushed_event_reaches_outbox(self, data_with_new_hw_status):
+        import tenants
+        import webhook
+
+        inbox = queue.Queue()
+        server = webhook.start_receiver(
+            inbox, port=0, host='127.0.0.1', secret='s3cret'
+        )
+        try:
+            headers = {
+                'Authorization': 'OAuth token-1',
+                'X-Webhook-Secret': 's3cret',
+            }
+            assert post(server, data_with_new_hw_status, headers) == 202
+            assert post(server, {'homeworks': 'x'}, headers) == 422, (
+                'Убедитесь, что события проверяются как ответы API.'
+            )
+            assert post(
+                server, data_with_new_hw_status,
+                {'Authorization': 'OAuth token-1'},
+            ) == 403
+        finally:
+            server.shutdown()
+
+        events = webhook.wait_events(inbox, timeout=1)
+        assert len(events) == 1
+        subscriber = tenants.Tenant('token-1', '7')
+        outbox = RecordingOutbox()
+        touched = tenants.apply_events(
+            events, tenants.index_by_token([subscriber]), outbox
+        )
+        assert touched == [subscriber]
+        assert outbox.messages and outbox.messages[0][0] == '7', (
+            'Убедитесь, что присланный статус уходит подписчику в Telegram.'
+        )
+
+    def test_pushed_event_keeps_polling_cursor(self, data_with_new_hw_status):
+        import tenants
+        from schema import validate_response
+
+        subscriber = tenants.Tenant('token-1', '7')
+        from_date = subscriber.from_date
+        response = validate_response(data_with_new_hw_status)
+        events = [('token-1', response.homeworks, response.current_date)]
+        tenants.apply_events(
+            events, tenants.index_by_token([subscriber]), RecordingOutbox()
+        )
+        assert subscriber.from_date == from_date, (
+            'Убедитесь, что события вебхука не сдвигают курсор опроса.'
+        )
+
+    def test_exposed_receiver_requires_secret(self):
+        import pytest
+
+        import exceptions
+        import webhook
+
+        with pytest.raises(exceptions.TokensError):
+            webhook.start_receiver(
+                queue.Queue(), port=0, host='0.0.0.0', secret=''
+            )
+
+    def test_wait_events_times_out(self):
+        import webhook
+
+        assert webhook.wait_events(queue.Queue(), timeout=0.01) == []
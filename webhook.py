@@ -0,0 +1,106 @@
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import exceptions
+from schema import validate_response
+
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+WEBHOOK_PORT = os.getenv('WEBHOOK_PORT')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_PATH = '/homework_statuses/'
+RECONCILE_PERIOD = int(os.getenv('RECONCILE_PERIOD', 6 * 60 * 60))
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Принимает статусы домашних работ, присланные источником.
+
+    Тело запроса — тот же JSON, что возвращает API Практикума; подписчик
+    определяется по заголовку Authorization: OAuth <токен>.
+    """
+
+    inbox = None
+    secret = WEBHOOK_SECRET
+
+    def do_POST(self):
+        """Проверяет событие и кладёт его в очередь."""
+        if self.path != WEBHOOK_PATH:
+            self.send_error(404)
+            return
+        if self.secret and not hmac.compare_digest(
+            self.headers.get('X-Webhook-Secret', ''), self.secret
+        ):
+            self.send_error(403)
+            return
+        authorization = self.headers.get('Authorization', '')
+        if not authorization.startswith('OAuth '):
+            self.send_error(401)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            self.send_error(413)
+            return
+        try:
+            response = validate_response(json.loads(self.rfile.read(length)))
+        except (
+            ValueError, TypeError, KeyError,
+            exceptions.NoCurrentDateError, exceptions.NotIntCurrentDateError,
+        ) as error:
+            logging.warning(f'Отклонено событие вебхука: {error}')
+            self.send_error(422, explain=str(error))
+            return
+        self.inbox.put((
+            authorization[len('OAuth '):], response.homeworks,
+            response.current_date,
+        ))
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        """Запросы логируются на уровне DEBUG."""
+        logging.debug(f'Вебхук: {format % args}')
+
+
+def start_receiver(
+    inbox, port=WEBHOOK_PORT, host=WEBHOOK_HOST, secret=WEBHOOK_SECRET
+):
+    """Запускает приёмник событий в фоновом потоке.
+
+    Не на локальном адресе приёмник запускается только с секретом.
+    """
+    if not secret and host not in LOOPBACK_HOSTS:
+        logging.critical('Отсутсвует переменная окружения WEBHOOK_SECRET')
+        raise exceptions.TokensError(
+            f'Приём событий на {host} без WEBHOOK_SECRET запрещён.'
+        )
+    handler = type(
+        'BoundWebhookHandler', (WebhookHandler,),
+        {'inbox': inbox, 'secret': secret},
+    )
+    server = ThreadingHTTPServer((host, int(port)), handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='webhook', daemon=True
+    ).start()
+    logging.info(f'Приём событий на {host}:{server.server_port}')
+    return server
+
+
+def wait_events(inbox, timeout):
+    """Ждёт первое событие не дольше timeout и забирает все накопившиеся."""
+    try:
+        events = [inbox.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while True:
+        try:
+            events.append(inbox.get_nowait())
+        except queue.Empty:
+            return events